@@ -1,21 +1,28 @@
+from startup_clock import IMPORT_START as _IMPORT_START
+
+import time
 import pygame as pg
+import numpy as np
+import os
 import sys
 import random
 import math
-from collections import namedtuple
+import zlib
+import re
+import hashlib
+import json
+import struct
+import sqlite3
+import argparse
+import threading
+from collections import namedtuple, Counter, OrderedDict
 from bisect import bisect_left
 
-pg.init()
-pg.mixer.init(frequency=22050, size=-16, channels=2, buffer=512)
-
 WIDTH, HEIGHT = 800, 600
 FPS = 60
-
-try:
-    import numpy as np
-    HAS_NUMPY = True
-except ImportError:
-    HAS_NUMPY = False
+SIM_DT = 1.0 / FPS
+_MAX_FRAME_TIME = 0.05
+_MAX_SIM_CATCHUP = 0.25
 
 BLACK = (10, 10, 10)
 WHITE = (240, 240, 240)
@@ -61,6 +68,10 @@ DIFFICULTY = {
 }
 
 LANE_CENTERS = [212, 325, 437, 550]
+_LANE_INDEX  = {lc: i for i, lc in enumerate(LANE_CENTERS)}
+
+ENTITY_CAR, ENTITY_BARRIER, ENTITY_OIL, ENTITY_COIN, ENTITY_POWERUP = range(5)
+GROUP_CARS, GROUP_MISC, GROUP_COINS, GROUP_POWERUPS = range(4)
 OBSTACLE_COLORS = [
     (255, 80, 80), (80, 255, 80), (255, 180, 60),
     (200, 80, 255), (80, 150, 255), (255, 220, 60),
@@ -78,16 +89,35 @@ _COMBO_THRESHOLDS  = (3, 7, 12, 18, 25)
 _COMBO_MULTIPLIERS = (1.5, 2.0, 2.5, 3.0, 4.0)
 _COMBO_MAP = {t: m for t, m in zip(_COMBO_THRESHOLDS, _COMBO_MULTIPLIERS)}
 
-_PARTICLE_POOL_SIZE = 150
+PARTICLE_OVERFLOW_DROP    = "drop"
+PARTICLE_OVERFLOW_RECYCLE = "recycle"
+
+_PARTICLE_POOL_SIZE = 256
+_PARTICLE_OVERFLOW  = PARTICLE_OVERFLOW_RECYCLE
+_PARTICLE_LEVELS    = 16
+_PARTICLE_SIZES     = np.maximum(2, (4 * (np.arange(_PARTICLE_LEVELS) + 0.5) / _PARTICLE_LEVELS).astype(np.intp))
+
+RoadMotion = namedtuple("RoadMotion", "columns edges span")
 
 _ROAD_BASE_SURF = None
+_ROAD_TEXTURE   = None
+_ROAD_SCALE     = None
+
+_MENU_BG_SURF   = None
+_MENU_BG_PERIOD = 60 * math.pi
+_MENU_BG_FLAT   = (10, 10, 20)
 
 WEATHER_CLEAR = "clear"
 WEATHER_RAIN  = "rain"
 
 COIN_BASE_VALUE = 5
 
-_RAIN_POOL_SIZE = 120
+_RAIN_POOL_SIZE    = 3200
+_RAIN_LIGHT_DROPS  = 120
+_RAIN_CLUSTER      = 8
+_RAIN_VARIANTS     = 6
+_RAIN_SPRITE_SIZE  = (96, 96)
+_RAIN_COLOR        = (180, 200, 220)
 
 UPGRADE_SPEED_MAX_LEVEL = 5
 UPGRADE_SPEED_STEP = 0.04
@@ -98,6 +128,23 @@ UPGRADE_LIFE_MAX_LEVEL = 2
 UPGRADE_LIFE_COST_BASE = 250
 UPGRADE_LIFE_COST_STEP = 200
 
+SimInput = namedtuple("SimInput", "left right boost")
+RunResult = namedtuple("RunResult", "score level coins time lives")
+HistoryRow = namedtuple("HistoryRow", "played_at difficulty skin score level coins duration speed_level life_level seed")
+_IDLE_INPUT = SimInput(False, False, False)
+
+SIM_MAX_TIME = 600.0
+
+_SOUND_NAMES = ("coin", "boost", "levelup", "hit", "explosion", "powerup")
+
+
+def init_pygame(headless=False):
+    if headless:
+        pg.font.init()
+        return
+    pg.init()
+    pg.mixer.init(frequency=22050, size=-16, channels=2, buffer=512)
+
 
 def clamp(v, lo, hi):
     return lo if v < lo else (hi if v > hi else v)
@@ -127,56 +174,794 @@ def upgrade_life_cost(level):
     return UPGRADE_LIFE_COST_BASE + level * UPGRADE_LIFE_COST_STEP
 
 
-def _make_sound(wave):
-    n = len(wave)
-    arr = np.array(wave * 32767, dtype=np.int16)
-    return pg.sndarray.make_sound(np.repeat(arr.reshape(n, 1), 2, axis=1))
+def _pcm(wave, channels):
+    arr = np.array(np.clip(wave, -1.0, 1.0) * 32767, dtype=np.int16)
+    return np.ascontiguousarray(np.repeat(arr.reshape(len(arr), 1), channels, axis=1))
 
 
 class _DummySound:
     def play(self): pass
 
 
+def _dummy_sounds():
+    dummy = _DummySound()
+    return {k: dummy for k in _SOUND_NAMES}
+
+
+def _synth_coin(t, p, rng):
+    freq = p["freq"] * np.exp(-t * p["freq_decay"])
+    return np.sin(2 * np.pi * freq * t) * np.exp(-t * p["decay"])
+
+
+def _synth_sweep(t, p, rng):
+    freq = p["freq"] + p["sweep"] * t / p["duration"]
+    return (np.sin(2 * np.pi * freq * t) + p["harmonic"] * np.sin(2 * np.pi * freq * 2 * t)) * np.exp(-t * p["decay"])
+
+
+def _synth_chord(t, p, rng):
+    return (np.sin(2 * np.pi * p["freq"] * t) * np.exp(-t * p["decay"][0]) +
+            np.sin(2 * np.pi * p["freq"] * 2 * t) * np.exp(-t * p["decay"][1]))
+
+
+def _synth_hit(t, p, rng):
+    noise = rng.normal(0, 1, len(t)) * np.exp(-t * p["noise_decay"])
+    tone  = np.sin(2 * np.pi * p["freq"] * t) * np.exp(-t * p["tone_decay"])
+    return (noise * p["noise_mix"] + tone * (1 - p["noise_mix"])) * np.exp(-t * p["decay"])
+
+
+def _synth_noise(t, p, rng):
+    return rng.normal(0, 1, len(t)) * np.exp(-t * p["decay"])
+
+
+_SOUND_CACHE_DIR     = "sound_cache"
+_SOUND_CACHE_VERSION = 1
+_SOUND_SEED          = 0x50D
+
+_SOUND_PARAMS = {
+    "coin":      dict(synth="coin",  duration=0.15, gain=0.60, freq=800, freq_decay=8, decay=15),
+    "boost":     dict(synth="sweep", duration=0.80, gain=0.76, freq=300, sweep=400, harmonic=0.0, decay=3),
+    "levelup":   dict(synth="chord", duration=0.60, gain=0.61, freq=440, decay=(2, 3)),
+    "hit":       dict(synth="hit",   duration=0.20, gain=0.46, freq=200, noise_decay=20, tone_decay=15, decay=10,
+                      noise_mix=0.6),
+    "explosion": dict(synth="noise", duration=0.50, gain=0.24, decay=15),
+    "powerup":   dict(synth="sweep", duration=0.50, gain=0.67, freq=500, sweep=700, harmonic=0.3, decay=4),
+}
+
+_SYNTHS = {
+    "coin":  _synth_coin,
+    "sweep": _synth_sweep,
+    "chord": _synth_chord,
+    "hit":   _synth_hit,
+    "noise": _synth_noise,
+}
+
+
+def _synthesize(name, sr, channels):
+    p   = _SOUND_PARAMS[name]
+    t   = np.arange(int(sr * p["duration"])) / sr
+    rng = np.random.default_rng((_SOUND_SEED, zlib.crc32(name.encode())))
+    return _pcm(_SYNTHS[p["synth"]](t, p, rng) * p["gain"], channels)
+
+
+def _sound_cache_key(name, mixer):
+    blob = json.dumps([_SOUND_CACHE_VERSION, _SOUND_SEED, list(mixer), _SOUND_PARAMS[name]], sort_keys=True)
+    return hashlib.sha1(blob.encode()).hexdigest()[:16]
+
+
+def _load_pcm(path, channels):
+    try:
+        pcm = np.load(path, allow_pickle=False)
+    except (OSError, ValueError):
+        return None
+    if pcm.dtype != np.int16 or pcm.ndim != 2 or pcm.shape[1] != channels:
+        return None
+    return pcm
+
+
+def _store_pcm(path, pcm):
+    tmp = path + ".tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp, "wb") as f:
+            np.save(f, pcm, allow_pickle=False)
+        os.replace(tmp, path)
+    except OSError:
+        return
+    prefix = os.path.basename(path).split(".")[0] + "."
+    for entry in os.listdir(os.path.dirname(path)):
+        if entry.startswith(prefix) and entry != os.path.basename(path):
+            try:
+                os.remove(os.path.join(os.path.dirname(path), entry))
+            except OSError:
+                pass
+
+
+def _sound_pcm(name, mixer, cache_dir=_SOUND_CACHE_DIR):
+    sr, _, channels = mixer
+    path = os.path.join(cache_dir, f"{name}.{_sound_cache_key(name, mixer)}.npy") if cache_dir else None
+    pcm  = _load_pcm(path, channels) if path else None
+    if pcm is None:
+        pcm = _synthesize(name, sr, channels)
+        if path:
+            _store_pcm(path, pcm)
+    return pcm
+
+
 def _build_sounds():
-    if not HAS_NUMPY:
-        dummy = _DummySound()
-        return {k: dummy for k in ("coin", "boost", "levelup", "hit", "explosion", "powerup")}
-    sr = 22050
-
-    def _buf(duration):
-        n = int(sr * duration)
-        return n, np.arange(n) / sr
-
-    n, t = _buf(0.15)
-    freq = 800 * np.exp(-t * 8)
-    coin = _make_sound(np.sin(2 * np.pi * freq * t) * np.exp(-t * 15) * 0.6)
-
-    n, t = _buf(0.8)
-    freq = 300 + 400 * t / 0.8
-    boost = _make_sound(np.sin(2 * np.pi * freq * t) * np.exp(-t * 3) * 0.76)
-
-    n, t = _buf(0.6)
-    levelup = _make_sound(
-        (np.sin(2 * np.pi * 440 * t) * np.exp(-t * 2) +
-         np.sin(2 * np.pi * 880 * t) * np.exp(-t * 3)) * 0.61
-    )
+    mixer = pg.mixer.get_init()
+    return {name: pg.sndarray.make_sound(_sound_pcm(name, mixer)) for name in _SOUND_NAMES}
 
-    n, t = _buf(0.2)
-    noise = np.random.normal(0, 1, n) * np.exp(-t * 20)
-    tone  = np.sin(2 * np.pi * 200 * t) * np.exp(-t * 15)
-    hit   = _make_sound((noise * 0.6 + tone * 0.4) * np.exp(-t * 10) * 0.46)
 
-    n, t = _buf(0.5)
-    noise = np.random.normal(0, 1, n) * np.exp(-t * 15)
-    explosion = _make_sound(noise * 0.24)
+def _menu_backdrop(scale=1.0):
+    global _MENU_BG_SURF
+    size = (max(1, round(WIDTH * scale)), round((HEIGHT + int(_MENU_BG_PERIOD) + 2) * scale))
+    if _MENU_BG_SURF is None or _MENU_BG_SURF.get_size() != size:
+        rows  = np.arange(size[1])
+        shade = np.clip(10 + (25 * np.sin(rows / (30 * scale))).astype(np.int32), 0, 255)
+        col   = np.stack([shade, shade, np.minimum(shade + 10, 255)], axis=-1).astype(np.uint8)
+        _MENU_BG_SURF = pg.surfarray.make_surface(np.repeat(col[np.newaxis], size[0], axis=0)).convert()
+    return _MENU_BG_SURF
 
-    n, t = _buf(0.5)
-    freq = 500 + 700 * t / 0.5
-    powerup = _make_sound(
-        (np.sin(2 * np.pi * freq * t) + 0.3 * np.sin(2 * np.pi * freq * 2 * t)) * np.exp(-t * 4) * 0.67
-    )
 
-    return dict(coin=coin, boost=boost, levelup=levelup, hit=hit, explosion=explosion, powerup=powerup)
+class SurfaceArena:
+    __slots__ = ("_surfaces", "allocations", "frame_allocations", "last_frame_allocations")
+
+    def __init__(self):
+        self._surfaces              = {}
+        self.allocations            = 0
+        self.frame_allocations      = 0
+        self.last_frame_allocations = 0
+
+    def __len__(self):
+        return len(self._surfaces)
+
+    def get(self, purpose, size, fill=None, flags=pg.SRCALPHA):
+        key  = (purpose, size, flags)
+        surf = self._surfaces.get(key)
+        if surf is None:
+            surf = self._surfaces[key] = pg.Surface(size, flags)
+            self.allocations       += 1
+            self.frame_allocations += 1
+        if fill is not None:
+            surf.fill(fill)
+        return surf
+
+    def track(self, surf):
+        self.allocations       += 1
+        self.frame_allocations += 1
+        return surf
+
+    def begin_frame(self):
+        self.last_frame_allocations = self.frame_allocations
+        self.frame_allocations      = 0
+
+    def clear(self):
+        self._surfaces.clear()
+
+
+_SCRATCH = SurfaceArena()
+_CLEAR   = (0, 0, 0, 0)
+
+INTERNAL_RES_WINDOW = "window"
+_SPRITE_CACHE_SIZE  = 1024
+
+
+class Display:
+    __slots__ = ("window", "canvas", "windowed_size", "fullscreen", "smooth", "internal", "scale", "unit", "_offscreen",
+                 "_size", "_view", "_target", "_sprites")
+
+    def __init__(self):
+        self.window        = None
+        self.canvas        = None
+        self.windowed_size = (WIDTH, HEIGHT)
+        self.fullscreen    = False
+        self.smooth        = False
+        self.internal      = (WIDTH, HEIGHT)
+        self.scale         = 1.0
+        self.unit          = True
+        self._offscreen    = None
+        self._size         = None
+        self._view         = None
+        self._target       = None
+        self._sprites      = OrderedDict()
+
+    @property
+    def direct(self):
+        return self.canvas is self.window
+
+    def open(self, size=None, fullscreen=None, smooth=None, internal=None):
+        if size is not None:
+            self.windowed_size = tuple(size)
+        if fullscreen is not None:
+            self.fullscreen = fullscreen
+        if smooth is not None:
+            self.smooth = smooth
+        if internal is not None:
+            self.internal = internal if internal == INTERNAL_RES_WINDOW else tuple(internal)
+        if self.fullscreen:
+            self.window = pg.display.set_mode((0, 0), pg.FULLSCREEN)
+        else:
+            self.window = pg.display.set_mode(self.windowed_size, pg.RESIZABLE)
+        self._layout()
+        return self.canvas
+
+    def _layout(self):
+        size        = self.window.get_size()
+        self._size  = size
+        fit         = min(size[0] / WIDTH, size[1] / HEIGHT)
+        self._view  = pg.Rect(0, 0, max(1, round(WIDTH * fit)), max(1, round(HEIGHT * fit)))
+        self._view.center = (size[0] // 2, size[1] // 2)
+        iw, ih      = self._view.size if self.internal == INTERNAL_RES_WINDOW else self.internal
+        self._rescale(min(iw / WIDTH, ih / HEIGHT))
+        canvas_size = self.size(WIDTH, HEIGHT)
+        self._target = None
+        if canvas_size == size:
+            self.canvas = self.window
+            return
+        self.window.fill((0, 0, 0))
+        if canvas_size == self._view.size:
+            self.canvas = self.window.subsurface(self._view)
+            return
+        if self._offscreen is None or self._offscreen.get_size() != canvas_size:
+            self._offscreen = pg.Surface(canvas_size).convert()
+        self._target = self.window.subsurface(self._view)
+        self.canvas  = self._offscreen
+
+    def _rescale(self, scale):
+        if scale != self.scale:
+            self.scale = scale
+            self.unit  = scale == 1.0
+            self._sprites.clear()
+
+    def resize(self, size):
+        if self.fullscreen or not all(size):
+            return False
+        self.window = pg.display.get_surface()
+        if self.window.get_size() != tuple(size):
+            self.window = pg.display.set_mode(size, pg.RESIZABLE)
+        if self.window.get_size() == self._size:
+            return False
+        self.windowed_size = self.window.get_size()
+        self._layout()
+        return True
+
+    def toggle_fullscreen(self):
+        return self.open(fullscreen=not self.fullscreen)
+
+    def to_logical(self, pos):
+        view = self._view
+        return ((pos[0] - view.x) * WIDTH // view.w, (pos[1] - view.y) * HEIGHT // view.h)
+
+    def mouse_pos(self):
+        return self.to_logical(pg.mouse.get_pos())
+
+    def size(self, w, h):
+        return max(1, round(w * self.scale)), max(1, round(h * self.scale))
+
+    def point(self, pos):
+        if self.unit:
+            return pos[0], pos[1]
+        return round(pos[0] * self.scale), round(pos[1] * self.scale)
+
+    def length(self, n):
+        return n if self.unit or not n else max(1, round(n * self.scale))
+
+    def rect(self, rect):
+        if self.unit:
+            return pg.Rect(rect)
+        rect, s = pg.Rect(rect), self.scale
+        x, y    = math.floor(rect.x * s), math.floor(rect.y * s)
+        return pg.Rect(x, y, math.ceil(rect.right * s) - x, math.ceil(rect.bottom * s) - y)
+
+    def resample(self, surf):
+        if self.unit:
+            return surf
+        size = self.size(*surf.get_size())
+        if surf.get_bitsize() < 24 or surf.get_colorkey() is not None:
+            return pg.transform.scale(surf, size)
+        return pg.transform.smoothscale(surf, size)
+
+    def sprite(self, surf):
+        if self.unit:
+            return surf
+        key    = id(surf)
+        cached = self._sprites.get(key)
+        if cached is None:
+            cached = self._sprites[key] = (surf, _SCRATCH.track(self.resample(surf)))
+            if len(self._sprites) > _SPRITE_CACHE_SIZE:
+                self._sprites.popitem(last=False)
+        else:
+            self._sprites.move_to_end(key)
+        return cached[1]
+
+    def blit(self, target, surf, pos, area=None):
+        if self.unit or target is not self.canvas:
+            return target.blit(surf, pos, area)
+        return target.blit(self.sprite(surf), self.point(pos), None if area is None else self.rect(area))
+
+    def blit_rescaled(self, target, surf, pos, purpose):
+        if self.unit or target is not self.canvas:
+            return target.blit(surf, pos)
+        scaled = _SCRATCH.get(purpose, self.size(*surf.get_size()))
+        pg.transform.smoothscale(surf, scaled.get_size(), scaled)
+        return target.blit(scaled, self.point(pos))
+
+    def present(self):
+        if self._target is not None:
+            if self.smooth:
+                pg.transform.smoothscale(self.canvas, self._view.size, self._target)
+            else:
+                pg.transform.scale(self.canvas, self._view.size, self._target)
+        pg.display.flip()
+
+
+_DISPLAY = Display()
+
+_TEXT_CACHE_SIZE  = 192
+_ATLAS_CACHE_SIZE = 32
+_ATLAS_TINT_STEP  = 8
+_ATLAS_CHARS      = frozenset("0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ .,:%+-!x")
+_DIGITS           = frozenset("0123456789")
+
+
+class GlyphAtlas:
+    __slots__ = ("surface", "areas", "height")
+
+    def __init__(self, surface, areas):
+        self.surface = surface
+        self.areas   = areas
+        self.height  = surface.get_height()
+
+    @classmethod
+    def rasterize(cls, font):
+        chars   = sorted(_ATLAS_CHARS)
+        glyphs  = [font.render(ch, True, (255, 255, 255)) for ch in chars]
+        surface = pg.Surface((sum(g.get_width() for g in glyphs), max(g.get_height() for g in glyphs)), pg.SRCALPHA)
+        surface.fill((255, 255, 255, 0))
+        areas   = {}
+        x = 0
+        for ch, g in zip(chars, glyphs):
+            areas[ch] = surface.blit(g, (x, 0))
+            x += g.get_width()
+        return cls(surface, areas)
+
+    def tinted(self, color):
+        surface = self.surface.copy()
+        surface.fill((*color[:3], 255), special_flags=pg.BLEND_RGBA_MULT)
+        return GlyphAtlas(surface, self.areas)
+
+    def width(self, text):
+        areas = self.areas
+        return sum(areas[ch].w for ch in text)
+
+
+class TextRenderer:
+    __slots__ = ("_strings", "_atlases", "_masters", "capacity", "atlas_capacity")
+
+    def __init__(self, capacity=_TEXT_CACHE_SIZE, atlas_capacity=_ATLAS_CACHE_SIZE):
+        self._strings       = OrderedDict()
+        self._atlases       = OrderedDict()
+        self._masters       = {}
+        self.capacity       = capacity
+        self.atlas_capacity = atlas_capacity
+
+    def __len__(self):
+        return len(self._strings)
+
+    def clear(self):
+        self._strings.clear()
+        self._atlases.clear()
+        self._masters.clear()
+
+    @staticmethod
+    def _lookup(cache, key, limit, build):
+        value = cache.get(key)
+        if value is None:
+            value = cache[key] = _SCRATCH.track(build())
+            if len(cache) > limit:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(key)
+        return value
+
+    @staticmethod
+    def composable(text):
+        chars = set(text)
+        return not chars.isdisjoint(_DIGITS) and chars <= _ATLAS_CHARS
+
+    def render(self, font, text, color):
+        return self._lookup(self._strings, (id(font), text, color), self.capacity,
+                            lambda: font.render(text, True, color))
+
+    def _master(self, font):
+        master = self._masters.get(id(font))
+        if master is None:
+            master = self._masters[id(font)] = _SCRATCH.track(GlyphAtlas.rasterize(font))
+        return master
+
+    def atlas(self, font, color):
+        master = self._master(font)
+        color  = tuple(min(255, (c + _ATLAS_TINT_STEP // 2) // _ATLAS_TINT_STEP * _ATLAS_TINT_STEP) for c in color[:3])
+        return self._lookup(self._atlases, (id(font), color), self.atlas_capacity, lambda: master.tinted(color))
+
+    def size(self, font, text):
+        if self.composable(text):
+            master = self._master(font)
+            return master.width(text), master.height
+        return font.size(text)
+
+    def draw(self, surface, font, text, color, pos, alpha=None):
+        scaled = not _DISPLAY.unit and surface is _DISPLAY.canvas
+        if not self.composable(text):
+            src = self.render(font, text, color)
+            if scaled:
+                src, pos = _DISPLAY.sprite(src), _DISPLAY.point(pos)
+            if alpha is None:
+                return surface.blit(src, pos)
+            src.set_alpha(alpha)
+            rect = surface.blit(src, pos)
+            src.set_alpha(None)
+            return rect
+        atlas  = self.atlas(font, color)
+        if scaled:
+            src, glyphs, rect = self._scaled_glyphs(atlas, text, pos)
+        else:
+            src    = atlas.surface
+            x, y   = pos
+            areas  = atlas.areas
+            glyphs = []
+            for ch in text:
+                area = areas[ch]
+                glyphs.append((src, (x, y), area))
+                x += area.w
+            rect = pg.Rect(pos[0], y, x - pos[0], atlas.height)
+        if alpha is not None:
+            src.set_alpha(alpha)
+        surface.blits(glyphs, doreturn=False)
+        if alpha is not None:
+            src.set_alpha(None)
+        return rect
+
+    @staticmethod
+    def _scaled_glyphs(atlas, text, pos):
+        src, s  = _DISPLAY.sprite(atlas.surface), _DISPLAY.scale
+        h       = src.get_height()
+        x, y    = pos
+        top     = round(y * s)
+        left    = right = round(x * s)
+        glyphs  = []
+        for ch in text:
+            area   = atlas.areas[ch]
+            a0, a1 = round(area.x * s), round(area.right * s)
+            gx     = round(x * s)
+            glyphs.append((src, (gx, top), (a0, 0, a1 - a0, h)))
+            right  = max(right, gx + a1 - a0)
+            x     += area.w
+        return src, glyphs, pg.Rect(left, top, right - left, h)
+
+    def draw_centered(self, surface, font, text, color, center, alpha=None):
+        w, h = self.size(font, text)
+        return self.draw(surface, font, text, color, (center[0] - w // 2, center[1] - h // 2), alpha)
+
+
+_TEXT = TextRenderer()
+
+
+_UI_LAYER_BASE = (0, 0, 0, 1)
+
+
+class UILayer:
+    __slots__ = ("surface", "key", "regions", "_opaque", "_flags", "_logical")
+
+    def __init__(self, opaque=False, logical=True):
+        self.surface  = None
+        self._opaque  = opaque
+        self._flags   = 0 if opaque else pg.BLEND_PREMULTIPLIED
+        self._logical = logical
+        self.key      = None
+        self.regions  = []
+
+    def invalidate(self):
+        self.key = None
+
+    def _convert(self, surf):
+        return surf.convert() if self._opaque else surf.convert_alpha()
+
+    def _allocate(self, size):
+        self.surface = self._convert(pg.Surface(size, 0 if self._opaque else pg.SRCALPHA))
+
+    def update(self, key, build):
+        size = _DISPLAY.canvas.get_size()
+        if self.surface is None or self.surface.get_size() != size:
+            self._allocate(size)
+            self.key = None
+        if key != self.key:
+            self.key = None
+            if self._logical and not _DISPLAY.unit:
+                self._build_scaled(build)
+            else:
+                self.surface.fill(_UI_LAYER_BASE)
+                self.regions = build(self.surface) or [self.surface.get_rect()]
+            self.key = key
+        return self
+
+    def _build_scaled(self, build):
+        flags = 0 if self._opaque else pg.SRCALPHA
+        src   = _SCRATCH.get("ui_layer", (WIDTH, HEIGHT), _UI_LAYER_BASE, flags)
+        regions      = build(src) or [src.get_rect()]
+        self.surface = _SCRATCH.track(self._convert(pg.transform.smoothscale(src, self.surface.get_size())))
+        self.regions = [_DISPLAY.rect(r).clip(self.surface.get_rect()) for r in regions]
+
+    def draw(self, target):
+        src, flags = self.surface, self._flags
+        target.blits([(src, r.topleft, r, flags) for r in self.regions], doreturn=False)
+
+
+PROFILE_PHASES = ("idle", "events", "sim", "collide", "road", "entities", "player", "particles",
+                  "rain", "blur", "hud", "ui", "profiler", "present")
+(PHASE_IDLE, PHASE_EVENTS, PHASE_SIM, PHASE_COLLIDE, PHASE_ROAD, PHASE_ENTITIES, PHASE_PLAYER, PHASE_PARTICLES,
+ PHASE_RAIN, PHASE_BLUR, PHASE_HUD, PHASE_UI, PHASE_PROFILER, PHASE_PRESENT) = range(len(PROFILE_PHASES))
+
+_PROFILE_FRAMES      = 600
+_PROFILE_REFRESH     = 15
+_PROFILE_GRAPH       = (240, 60)
+_PROFILE_HEAD_WIDEST = "FRAME 888.88 MS  P50 888.88  P95 888.88  P99 888.88  MINIMAL"
+
+
+class FrameProfiler:
+    __slots__ = ("lap", "enabled", "frames", "_start", "_ms", "_at", "_level", "_quality", "_row", "_first", "_t0",
+                 "_last", "_origin", "_panel")
+
+    def __init__(self, capacity=_PROFILE_FRAMES, enabled=False):
+        n = len(PROFILE_PHASES)
+        self._start   = np.zeros(capacity)
+        self._ms      = np.zeros((capacity, n))
+        self._at      = np.zeros((capacity, n))
+        self._level   = np.zeros(capacity, np.int32)
+        self._quality = np.zeros(capacity, np.int8)
+        self._row     = [0.0] * n
+        self._first   = [-1.0] * n
+        self._origin  = time.perf_counter()
+        self._t0      = self._last = self._origin
+        self._panel   = None
+        self.frames   = 0
+        self.enable(enabled)
+
+    def __len__(self):
+        return min(self.frames, len(self._start))
+
+    def enable(self, on=True):
+        self.enabled = on
+        self.lap     = self._lap if on else _skip_lap
+
+    def begin_frame(self):
+        if self.enabled:
+            self._t0 = self._last = time.perf_counter()
+
+    def _lap(self, phase):
+        t = time.perf_counter()
+        if self._first[phase] < 0:
+            self._first[phase] = self._last - self._t0
+        self._row[phase] += t - self._last
+        self._last = t
+
+    def end_frame(self, level=0, quality=0):
+        if not self.enabled:
+            return
+        i = self.frames % len(self._start)
+        self._start[i]   = self._t0 - self._origin
+        self._ms[i]      = self._row
+        self._at[i]      = self._first
+        self._level[i]   = level
+        self._quality[i] = quality
+        self._ms[i]     *= 1000.0
+        self._at[i]     *= 1000.0
+        self._row        = [0.0] * len(self._row)
+        self._first      = [-1.0] * len(self._first)
+        self.frames     += 1
+
+    def _order(self):
+        n = len(self)
+        if self.frames <= len(self._start):
+            return np.arange(n)
+        return (np.arange(n) + self.frames) % n
+
+    def totals(self):
+        return self._ms[self._order()].sum(axis=1)
+
+    def summary(self):
+        order = self._order()
+        if not len(order):
+            return None
+        totals = self._ms[order].sum(axis=1)
+        return {
+            "frames":  len(order),
+            "mean":    float(totals.mean()),
+            "p50":     float(np.percentile(totals, 50)),
+            "p95":     float(np.percentile(totals, 95)),
+            "p99":     float(np.percentile(totals, 99)),
+            "quality": QUALITY_NAMES[self._quality[order[-1]]],
+            "phases":  dict(zip(PROFILE_PHASES, self._ms[order].mean(axis=0).tolist())),
+        }
+
+    def export(self, path):
+        if path.endswith(".json"):
+            self.export_trace(path)
+        else:
+            self.export_csv(path)
+
+    def export_csv(self, path):
+        order = self._order()
+        with open(path, "w") as f:
+            f.write(",".join(("frame", "start_ms", "level", "quality", "total_ms") + PROFILE_PHASES) + "\n")
+            first = self.frames - len(order)
+            for n, i in enumerate(order.tolist()):
+                row = self._ms[i]
+                f.write(f"{first + n},{self._start[i] * 1000.0:.3f},{self._level[i]},{QUALITY_NAMES[self._quality[i]]},"
+                        f"{row.sum():.4f},"
+                        + ",".join(f"{v:.4f}" for v in row.tolist()) + "\n")
+
+    def export_trace(self, path):
+        events = []
+        first  = self.frames - len(self)
+        for n, i in enumerate(self._order().tolist()):
+            ts = self._start[i] * 1e6
+            ms = self._ms[i].tolist()
+            events.append({"name": "frame", "ph": "X", "pid": 0, "tid": 0, "ts": ts, "dur": sum(ms) * 1000.0,
+                           "args": {"frame": first + n, "level": int(self._level[i]),
+                                    "quality": QUALITY_NAMES[self._quality[i]]}})
+            for phase, dur, at in zip(PROFILE_PHASES, ms, self._at[i].tolist()):
+                if at >= 0:
+                    events.append({"name": phase, "ph": "X", "pid": 0, "tid": 0, "ts": ts + at * 1000.0,
+                                   "dur": dur * 1000.0})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def draw(self, surface, font):
+        if self._panel is None or self.frames % _PROFILE_REFRESH == 0:
+            self._panel = self._build_panel(font)
+        if self._panel is not None:
+            pos = (8, HEIGHT - self._panel.get_height() - 8)
+            return _DISPLAY.blit_rescaled(surface, self._panel, pos, "profiler_view")
+
+    def _build_panel(self, font):
+        stats = self.summary()
+        if stats is None:
+            return None
+        gw, gh = _PROFILE_GRAPH
+        head   = (f"FRAME {stats['mean']:.2f} MS  P50 {stats['p50']:.2f}  P95 {stats['p95']:.2f}  P99 {stats['p99']:.2f}"
+                  f"  {stats['quality'].upper()}")
+        lh     = font.get_linesize()
+        width  = max(gw, _TEXT.size(font, _PROFILE_HEAD_WIDEST)[0]) + 16
+        panel  = _SCRATCH.get("profiler_panel", (width, gh + lh * (len(PROFILE_PHASES) + 1) + 20), (0, 0, 0, 170))
+        _TEXT.draw(panel, font, head, WHITE, (8, 6))
+        for n, (name, ms) in enumerate(stats["phases"].items(), 1):
+            value = f"{ms:.2f}"
+            _TEXT.draw(panel, font, name, GRAY, (8, 6 + n * lh))
+            _TEXT.draw(panel, font, value, WHITE, (120 - _TEXT.size(font, value)[0], 6 + n * lh))
+        top     = panel.get_height() - gh - 8
+        budget  = 1000.0 / FPS
+        totals  = self.totals()[-gw:]
+        scale   = gh / max(budget * 2, float(totals.max()))
+        pg.draw.line(panel, (80, 200, 80), (8, top + gh - budget * scale), (8 + gw, top + gh - budget * scale))
+        if len(totals) > 1:
+            pts = [(8 + x, top + gh - v * scale) for x, v in enumerate(totals.tolist())]
+            pg.draw.lines(panel, YELLOW, False, pts)
+        return panel
+
+
+def _skip_lap(phase):
+    pass
+
+
+STARTUP_BUDGET = 1.0
+
+
+class StartupProfiler:
+    __slots__ = ("origin", "steps", "deferred", "_last")
+
+    def __init__(self, origin):
+        self.origin   = origin
+        self.steps    = []
+        self.deferred = []
+        self._last    = origin
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.steps.append((name, now - self._last))
+        self._last = now
+
+    def timed(self, name, build):
+        start  = time.perf_counter()
+        result = build()
+        self.deferred.append((name, time.perf_counter() - start))
+        return result
+
+    def elapsed(self):
+        return self._last - self.origin
+
+    def over_budget(self, budget):
+        return budget is not None and self.elapsed() > budget
+
+    @staticmethod
+    def _format(steps):
+        return [f"  {name:<14} {dt * 1000:8.1f} ms" for name, dt in steps]
+
+    def report(self, budget=None):
+        head = f"startup: {self.elapsed() * 1000:.1f} ms from import to first frame"
+        if budget is not None:
+            head += f" (budget {budget * 1000:.0f} ms{', OVER BUDGET' if self.over_budget(budget) else ''})"
+        return "\n".join([head] + self._format(self.steps))
+
+    def report_deferred(self):
+        total = sum(dt for _, dt in self.deferred)
+        return "\n".join([f"deferred init: {total * 1000:.1f} ms after first frame"] + self._format(self.deferred))
+
+
+_STARTUP = StartupProfiler(_IMPORT_START)
+
+QualityTier = namedtuple("QualityTier", "name particles rain blur glow gradient")
+
+QUALITY_TIERS = (
+    QualityTier("high",    1.0,  1.0,  True,  True,  True),
+    QualityTier("medium",  0.6,  0.6,  True,  True,  True),
+    QualityTier("low",     0.3,  0.3,  False, True,  False),
+    QualityTier("minimal", 0.15, 0.15, False, False, False),
+)
+QUALITY_NAMES = tuple(t.name for t in QUALITY_TIERS)
+
+_QUALITY_WINDOW   = 60
+_QUALITY_DOWN     = 1.0
+_QUALITY_UP       = 0.6
+_QUALITY_UP_HOLD  = 4
+_QUALITY_MAX_HOLD = 32
+
+
+class QualityGovernor:
+    __slots__ = ("budget", "tier", "locked", "changes", "_times", "_count", "_up_hold", "_probing")
+
+    def __init__(self, quality="auto", budget=1.0 / FPS, window=_QUALITY_WINDOW):
+        self.budget   = budget
+        self.locked   = quality != "auto"
+        self.tier     = QUALITY_NAMES.index(quality) if self.locked else 0
+        self.changes  = 0
+        self._times   = np.zeros(window)
+        self._count   = 0
+        self._up_hold = window * _QUALITY_UP_HOLD
+        self._probing = False
+
+    @property
+    def level(self):
+        return QUALITY_TIERS[self.tier]
+
+    @property
+    def name(self):
+        return QUALITY_TIERS[self.tier].name
+
+    def sample(self, seconds):
+        window = len(self._times)
+        self._times[self._count % window] = seconds
+        self._count += 1
+        if self.locked or self._count < window:
+            return False
+        p90 = float(np.percentile(self._times, 90))
+        if p90 > self.budget * _QUALITY_DOWN and self.tier < len(QUALITY_TIERS) - 1:
+            if self._probing:
+                self._up_hold = min(self._up_hold * 2, window * _QUALITY_MAX_HOLD)
+            return self._step(1, False)
+        if self._probing:
+            self._probing = False
+            self._up_hold = window * _QUALITY_UP_HOLD
+        if p90 < self.budget * _QUALITY_UP and self.tier > 0 and self._count >= self._up_hold:
+            return self._step(-1, True)
+        return False
+
+    def _step(self, delta, probing):
+        self.tier    += delta
+        self.changes += 1
+        self._count   = 0
+        self._probing = probing
+        return True
 
 
 def draw_heart(surface, cx, cy, size, color):
@@ -196,7 +981,7 @@ def draw_arrow(surface, cx, cy, size, color, direction):
 
 
 def draw_car(surface, x, y, w, h, body_color, window_color, car_type, player=False):
-    shadow = pg.Surface((w + 6, h // 3), pg.SRCALPHA)
+    shadow = _SCRATCH.get("car_shadow", (w + 6, h // 3), _CLEAR)
     pg.draw.ellipse(shadow, (0, 0, 0, 80), shadow.get_rect())
     surface.blit(shadow, (x - 3, y + h - h // 6))
 
@@ -231,163 +1016,250 @@ def draw_car(surface, x, y, w, h, body_color, window_color, car_type, player=Fal
         pg.draw.rect(surface, RED, (x + 4, y + h - 4, w - 8, 4), border_radius=2)
 
 
-class ParticlePool:
-    __slots__ = ("_pool", "_active")
-
-    def __init__(self, size):
-        self._pool   = [_PooledParticle() for _ in range(size)]
-        self._active = []
+def _particle_sprite(color, level):
+    size = int(_PARTICLE_SIZES[level])
+    s    = pg.Surface((size * 2, size * 2), pg.SRCALPHA)
+    pg.draw.circle(s, (*color, int(255 * (level + 0.5) / _PARTICLE_LEVELS)), (size, size), size)
+    return s
 
-    def spawn(self, x, y, vx, vy, color, lifetime):
-        for p in self._pool:
-            if not p.alive:
-                p.reset(x, y, vx, vy, color, lifetime)
-                self._active.append(p)
-                return
-        p = _PooledParticle()
-        p.reset(x, y, vx, vy, color, lifetime)
-        self._active.append(p)
 
-    def update_and_draw(self, surface, dt):
-        keep = []
-        for p in self._active:
-            if p.update(dt):
-                p.draw(surface)
-                keep.append(p)
-            else:
-                p.alive = False
-        self._active = keep
-
-
-class _PooledParticle:
-    __slots__ = ("x", "y", "vx", "vy", "color", "lifetime", "max_lifetime", "alive", "_surf_cache")
-    _global_cache = {}
-    _MAX_CACHE    = 128
-
-    def __init__(self):
-        self.alive       = False
-        self._surf_cache = self.__class__._global_cache
-
-    def reset(self, x, y, vx, vy, color, lifetime):
-        self.x            = x
-        self.y            = y
-        self.vx           = vx
-        self.vy           = vy
-        self.color        = color
-        self.lifetime     = lifetime
-        self.max_lifetime = lifetime
-        self.alive        = True
+class ParticlePool:
+    __slots__ = ("capacity", "overflow", "_pos", "_vel", "_life", "_max_life", "_sprite_base", "_alive",
+                 "_free", "_n_free", "_palette", "_sprites")
+
+    def __init__(self, capacity, overflow=PARTICLE_OVERFLOW_RECYCLE):
+        self.capacity     = capacity
+        self.overflow     = overflow
+        self._pos         = np.zeros((capacity, 2), np.float32)
+        self._vel         = np.zeros((capacity, 2), np.float32)
+        self._life        = np.zeros(capacity, np.float32)
+        self._max_life    = np.ones(capacity, np.float32)
+        self._sprite_base = np.zeros(capacity, np.intp)
+        self._alive       = np.zeros(capacity, bool)
+        self._free        = np.arange(capacity - 1, -1, -1)
+        self._n_free      = capacity
+        self._palette     = {}
+        self._sprites     = []
+
+    def __len__(self):
+        return self.capacity - self._n_free
+
+    def clear(self):
+        self._alive[:] = False
+        self._free[:]  = np.arange(self.capacity - 1, -1, -1)
+        self._n_free   = self.capacity
+
+    def _sprite_base_for(self, color):
+        base = self._palette.get(color)
+        if base is None:
+            base = self._palette[color] = len(self._sprites)
+            self._sprites.extend(_particle_sprite(color, level) for level in range(_PARTICLE_LEVELS))
+        return base
+
+    def _take(self, count):
+        n             = min(count, self._n_free)
+        self._n_free -= n
+        idx           = self._free[self._n_free:self._n_free + n].copy()
+        if n == count or self.overflow == PARTICLE_OVERFLOW_DROP:
+            return idx
+        alive = np.flatnonzero(self._alive)
+        steal = min(count - n, len(alive))
+        if steal < len(alive):
+            alive = alive[np.argpartition(self._life[alive], steal - 1)[:steal]]
+        return np.concatenate((idx, alive))
+
+    def emit(self, x, y, vx, vy, color, lifetime):
+        idx = self._take(len(vx))
+        k   = len(idx)
+        if not k:
+            return
+        self._pos[idx]         = (x, y)
+        self._vel[idx, 0]      = vx[:k]
+        self._vel[idx, 1]      = vy[:k]
+        self._life[idx]        = lifetime[:k]
+        self._max_life[idx]    = lifetime[:k]
+        self._sprite_base[idx] = self._sprite_base_for(color)
+        self._alive[idx]       = True
 
     def update(self, dt):
-        self.x        += self.vx * dt
-        self.y        += self.vy * dt
-        self.lifetime -= dt
-        return self.lifetime > 0
+        self._pos  += self._vel * dt
+        self._life -= dt
+        dead = np.flatnonzero(self._alive & (self._life <= 0))
+        if len(dead):
+            self._alive[dead] = False
+            self._free[self._n_free:self._n_free + len(dead)] = dead
+            self._n_free += len(dead)
 
     def draw(self, surface):
-        ratio = self.lifetime / self.max_lifetime
-        alpha = int(255 * ratio)
-        size  = max(2, int(4 * ratio))
-        key   = (size, self.color, alpha)
-        if key not in self._surf_cache:
-            if len(self._surf_cache) >= self.__class__._MAX_CACHE:
-                self._surf_cache.pop(next(iter(self._surf_cache)))
-            s = pg.Surface((size * 2, size * 2), pg.SRCALPHA)
-            pg.draw.circle(s, (*self.color, alpha), (size, size), size)
-            self._surf_cache[key] = s
-        surface.blit(self._surf_cache[key], (int(self.x - size), int(self.y - size)))
+        idx = np.flatnonzero(self._alive)
+        if not len(idx):
+            return
+        level   = np.minimum((self._life[idx] / self._max_life[idx] * _PARTICLE_LEVELS).astype(np.intp),
+                             _PARTICLE_LEVELS - 1)
+        half    = _PARTICLE_SIZES[level]
+        pos     = self._pos[idx]
+        scale   = _DISPLAY.scale
+        xs      = ((pos[:, 0] - half) * scale).astype(np.intp)
+        ys      = ((pos[:, 1] - half) * scale).astype(np.intp)
+        sprites = self._sprites if _DISPLAY.unit else [_DISPLAY.sprite(s) for s in self._sprites]
+        surface.blits([(sprites[k], (x, y)) for k, x, y in
+                       zip((self._sprite_base[idx] + level).tolist(), xs.tolist(), ys.tolist())], doreturn=False)
+        x0, y0 = int(xs.min()), int(ys.min())
+        reach  = _DISPLAY.length(8)
+        return pg.Rect(x0, y0, int(xs.max()) - x0 + reach, int(ys.max()) - y0 + reach)
+
+    def update_and_draw(self, surface, dt):
+        self.update(dt)
+        return self.draw(surface)
+
+
+def _rain_sprites(scale=1.0):
+    rng     = random.Random(0x7A1D)
+    w, h    = _RAIN_SPRITE_SIZE
+    sprites = []
+    for _ in range(_RAIN_VARIANTS):
+        s = pg.Surface((w, h))
+        for _ in range(_RAIN_CLUSTER):
+            x, y   = rng.randint(5, w - 1), rng.randint(0, h - 17)
+            length = rng.randint(12, 16)
+            pg.draw.line(s, _RAIN_COLOR, (x, y), (x - 4 * length // 14, y + length), 2)
+        if scale != 1.0:
+            s = pg.transform.scale(s, (max(1, round(w * scale)), max(1, round(h * scale))))
+        s.set_colorkey((0, 0, 0), pg.RLEACCEL)
+        sprites.append(s)
+    return sprites
 
 
 class RainPool:
-    __slots__ = ("_drops", "_active_count")
-
-    def __init__(self, size):
-        self._drops = [[0.0, 0.0, 0.0] for _ in range(size)]
+    __slots__ = ("_x", "_y", "_speed", "_variant", "_active_count", "_rng", "_sprites", "_scale", "_alpha")
+
+    def __init__(self, size, rng=None):
+        clusters           = -(-size // _RAIN_CLUSTER)
+        self._x            = np.zeros(clusters, np.float32)
+        self._y            = np.zeros(clusters, np.float32)
+        self._speed        = np.zeros(clusters, np.float32)
+        self._variant      = np.zeros(clusters, np.intp)
         self._active_count = 0
+        self._rng          = np.random.default_rng() if rng is None else rng
+        self._sprites      = None
+        self._scale        = None
+        self._alpha        = None
+
+    @property
+    def capacity(self):
+        return len(self._x) * _RAIN_CLUSTER
 
     def set_active(self, count):
-        self._active_count = clamp(count, 0, len(self._drops))
+        count = -(-clamp(count, 0, self.capacity) // _RAIN_CLUSTER)
+        if count > self._active_count:
+            self._respawn(np.arange(self._active_count, count))
+        self._active_count = count
+
+    def _respawn(self, idx):
+        n, rng = len(idx), self._rng
+        w, h   = _RAIN_SPRITE_SIZE
+        self._x[idx]       = rng.uniform(-w, WIDTH, n)
+        self._y[idx]       = rng.uniform(-HEIGHT - h, -h, n)
+        self._speed[idx]   = rng.uniform(600, 900, n)
+        self._variant[idx] = rng.integers(0, _RAIN_VARIANTS, n)
 
-    def reset_drop(self, idx):
-        d = self._drops[idx]
-        d[0] = random.uniform(0, WIDTH)
-        d[1] = random.uniform(-HEIGHT, 0)
-        d[2] = random.uniform(600, 900)
+    def update(self, dt):
+        n = self._active_count
+        if n <= 0:
+            return
+        y     = self._y[:n]
+        y    += self._speed[:n] * dt
+        gone  = np.flatnonzero(y > HEIGHT)
+        if len(gone):
+            self._respawn(gone)
+
+    def draw(self, surface, intensity):
+        n = self._active_count
+        if n <= 0:
+            return
+        alpha = int(140 * intensity)
+        scale = _DISPLAY.scale
+        if self._sprites is None or self._scale != scale:
+            self._sprites, self._scale, self._alpha = _rain_sprites(scale), scale, None
+        if alpha != self._alpha:
+            for sprite in self._sprites:
+                sprite.set_alpha(alpha, pg.RLEACCEL)
+            self._alpha = alpha
+        vis     = np.flatnonzero(self._y[:n] > -_RAIN_SPRITE_SIZE[1])
+        sprites = self._sprites
+        xs      = (self._x[vis] * scale).astype(np.intp).tolist()
+        ys      = (self._y[vis] * scale).astype(np.intp).tolist()
+        surface.blits([(sprites[v], (x, y)) for v, x, y in zip(self._variant[vis].tolist(), xs, ys)], doreturn=False)
 
     def update_and_draw(self, surface, dt, intensity):
-        if self._active_count <= 0:
-            return
-        col = (180, 200, 220, int(140 * intensity))
-        for i in range(self._active_count):
-            d = self._drops[i]
-            if d[2] == 0.0:
-                self.reset_drop(i)
-                d = self._drops[i]
-            d[1] += d[2] * dt
-            if d[1] > HEIGHT:
-                self.reset_drop(i)
-                d = self._drops[i]
-            pg.draw.line(surface, col, (d[0], d[1]), (d[0] - 4, d[1] + 14), 2)
+        self.update(dt)
+        self.draw(surface, intensity)
 
 
 class StaticObstacle:
+    KIND   = None
     WIDTH  = 0
     HEIGHT = 0
+    CONSUMED_ON_HIT = False
 
-    def __init__(self, x, speed):
-        self.x     = x
-        self.y     = float(-self.HEIGHT)
-        self.speed = speed
-        if not hasattr(self.__class__, "_surf") or self.__class__._surf is None:
-            self.__class__._surf = self._build_surf()
-
-    def _build_surf(self):
-        raise NotImplementedError
-
-    def update(self, dt):
-        self.y += self.speed * dt
-        return self.y > HEIGHT
-
-    def draw(self, surface):
-        surface.blit(self.__class__._surf, (self.x, int(self.y)))
+    @classmethod
+    def spawn(cls, store, x, speed):
+        return store.add(cls.KIND, _LANE_INDEX.get(x + cls.WIDTH // 2), x, float(-cls.HEIGHT), speed)
 
-    def get_rect(self):
-        return pg.Rect(self.x, self.y, self.WIDTH, self.HEIGHT)
+    @classmethod
+    def rect(cls, x, y, h):
+        return pg.Rect(x, y, cls.WIDTH, cls.HEIGHT)
 
 
 class Barrier(StaticObstacle):
+    KIND = ENTITY_BARRIER
     WIDTH, HEIGHT = 60, 20
     _surf = None
 
-    def _build_surf(self):
-        s = pg.Surface((self.WIDTH, self.HEIGHT), pg.SRCALPHA)
-        pg.draw.rect(s, (200, 200, 210), (0, 0, self.WIDTH, self.HEIGHT), border_radius=3)
+    @classmethod
+    def _build_surf(cls):
+        s = pg.Surface((cls.WIDTH, cls.HEIGHT), pg.SRCALPHA)
+        pg.draw.rect(s, (200, 200, 210), (0, 0, cls.WIDTH, cls.HEIGHT), border_radius=3)
         for i in range(3):
-            pg.draw.rect(s, ORANGE, (i * 20 + 2, 2, 14, self.HEIGHT - 4), border_radius=2)
+            pg.draw.rect(s, ORANGE, (i * 20 + 2, 2, 14, cls.HEIGHT - 4), border_radius=2)
         return s
 
+    @classmethod
+    def draw(cls, surface, x, y, phase, sprite):
+        if cls._surf is None:
+            cls._surf = cls._build_surf()
+        return _DISPLAY.blit(surface, cls._surf, (x, int(y)))
+
+
+class SpriteCycle:
+    __slots__ = ("frames", "_scale")
+
+    def __init__(self, build, count, period):
+        self.frames = [build(i * period / count) for i in range(count)]
+        self._scale = count / period
+
+    def __len__(self):
+        return len(self.frames)
+
+    def at(self, phase):
+        return self.frames[int(phase * self._scale) % len(self.frames)]
+
+
+_ANIM_FRAMES = 32
 
-class OilSlick:
+
+class OilSlick(StaticObstacle):
+    KIND = ENTITY_OIL
     WIDTH, HEIGHT = 54, 28
-    _surf_outer = None
-    _surf_inner = None
-
-    def __init__(self, x, speed):
-        self.x     = x
-        self.y     = float(-self.HEIGHT)
-        self.speed = speed
-        self.angle = 0.0
-        if OilSlick._surf_outer is None:
-            OilSlick._surf_outer = pg.Surface((self.WIDTH, self.HEIGHT), pg.SRCALPHA)
-            OilSlick._surf_inner = pg.Surface((self.WIDTH - 10, self.HEIGHT - 6), pg.SRCALPHA)
+    CONSUMED_ON_HIT = True
+    _cycle = None
 
-    def update(self, dt):
-        self.y     += self.speed * dt
-        self.angle += dt * 2.0
-        return self.y > HEIGHT
+    @classmethod
+    def spawn(cls, store, x, speed):
+        return store.add(cls.KIND, _LANE_INDEX.get(x + cls.WIDTH // 2), x, float(-cls.HEIGHT), speed, phase_rate=2.0)
 
-    def draw(self, surface):
-        t  = self.angle
+    @classmethod
+    def _build_frame(cls, t):
         c0 = (
             clamp(int(100 + 80 * math.sin(t)), 0, 255),
             clamp(int(50  + 80 * math.sin(t + 2.1)), 0, 255),
@@ -400,120 +1272,312 @@ class OilSlick:
             clamp(int(50  + 80 * math.sin(t + 5.2)), 0, 255),
             180,
         )
-        OilSlick._surf_outer.fill((0, 0, 0, 0))
-        pg.draw.ellipse(OilSlick._surf_outer, c0, OilSlick._surf_outer.get_rect())
-        surface.blit(OilSlick._surf_outer, (self.x, self.y))
-        OilSlick._surf_inner.fill((0, 0, 0, 0))
-        pg.draw.ellipse(OilSlick._surf_inner, c1, OilSlick._surf_inner.get_rect())
-        surface.blit(OilSlick._surf_inner, (self.x + 5, self.y + 3))
-
-    def get_rect(self):
-        return pg.Rect(self.x, self.y, self.WIDTH, self.HEIGHT)
+        outer = pg.Surface((cls.WIDTH, cls.HEIGHT), pg.SRCALPHA)
+        inner = pg.Surface((cls.WIDTH - 10, cls.HEIGHT - 6), pg.SRCALPHA)
+        pg.draw.ellipse(outer, c0, outer.get_rect())
+        pg.draw.ellipse(inner, c1, inner.get_rect())
+        return outer, inner
+
+    @classmethod
+    def animation(cls):
+        if cls._cycle is None:
+            cls._cycle = SpriteCycle(cls._build_frame, _ANIM_FRAMES * 2, math.pi * 2)
+        return cls._cycle
+
+    @classmethod
+    def draw(cls, surface, x, y, phase, sprite):
+        outer, inner = (cls._cycle or cls.animation()).at(phase)
+        rect = _DISPLAY.blit(surface, outer, (x, y))
+        _DISPLAY.blit(surface, inner, (x + 5, y + 3))
+        return rect
 
 
 class Coin:
+    KIND   = ENTITY_COIN
     RADIUS = 11
-    _cache = {}
-    _MAX_CACHE = 64
+    CONSUMED_ON_HIT = True
+    _cycle = None
+
+    @classmethod
+    def spawn(cls, store, x, speed, rng=random):
+        return store.add(cls.KIND, _LANE_INDEX.get(x), x, float(-cls.RADIUS * 2), speed,
+                         phase=rng.uniform(0, math.pi * 2), phase_rate=8.0)
+
+    @classmethod
+    def _build_face(cls, w):
+        h = cls.RADIUS * 2
+        s = pg.Surface((w, h), pg.SRCALPHA)
+        pg.draw.ellipse(s, (220, 180, 30), (0, 0, w, h))
+        pg.draw.ellipse(s, (255, 220, 70), (1, 1, w - 2, h - 2))
+        pg.draw.ellipse(s, (255, 250, 150), (w // 4, 2, w // 2, h // 4))
+        return s
 
-    def __init__(self, x, speed):
-        self.x     = x
-        self.y     = float(-self.RADIUS * 2)
-        self.speed = speed
-        self.angle = random.uniform(0, math.pi * 2)
+    @classmethod
+    def animation(cls):
+        if cls._cycle is None:
+            faces = {}
 
-    def update(self, dt):
-        self.y     += self.speed * dt
-        self.angle += 8.0 * dt
-        return self.y > HEIGHT
+            def build(phase):
+                w = max(4, int(cls.RADIUS * 2 * abs(math.cos(phase))))
+                if w not in faces:
+                    faces[w] = cls._build_face(w)
+                return faces[w], -(w // 2), -cls.RADIUS
+            cls._cycle = SpriteCycle(build, _ANIM_FRAMES * 2, math.pi)
+        return cls._cycle
 
-    def draw(self, surface):
-        w   = max(4, int(self.RADIUS * 2 * abs(math.cos(self.angle))))
-        key = w
-        if key not in Coin._cache:
-            if len(Coin._cache) >= Coin._MAX_CACHE:
-                Coin._cache.pop(next(iter(Coin._cache)))
-            h = self.RADIUS * 2
-            s = pg.Surface((w, h), pg.SRCALPHA)
-            pg.draw.ellipse(s, (220, 180, 30), (0, 0, w, h))
-            pg.draw.ellipse(s, (255, 220, 70), (1, 1, w - 2, h - 2))
-            pg.draw.ellipse(s, (255, 250, 150), (w // 4, 2, w // 2, h // 4))
-            Coin._cache[key] = s
-        surface.blit(Coin._cache[key], (self.x - w // 2, self.y - self.RADIUS))
+    @classmethod
+    def draw(cls, surface, x, y, phase, sprite):
+        face, dx, dy = (cls._cycle or cls.animation()).at(phase)
+        return _DISPLAY.blit(surface, face, (x + dx, y + dy))
 
-    def get_rect(self):
-        return pg.Rect(self.x - self.RADIUS, self.y - self.RADIUS, self.RADIUS * 2, self.RADIUS * 2)
+    @classmethod
+    def rect(cls, x, y, h):
+        return pg.Rect(x - cls.RADIUS, y - cls.RADIUS, cls.RADIUS * 2, cls.RADIUS * 2)
 
 
 class PowerUp:
+    KIND   = ENTITY_POWERUP
     RADIUS = 14
-
-    def __init__(self, x, speed, kind):
-        self.x     = x
-        self.y     = float(-self.RADIUS * 2)
-        self.speed = speed
-        self.kind  = kind
-        self.angle = 0.0
+    PULSE  = 4
+    CONSUMED_ON_HIT = True
+    _kinds  = list(POWERUP_META)
+    _cycles = {}
+    glow    = True
+
+    @classmethod
+    def spawn(cls, store, x, speed, kind):
+        return store.add(cls.KIND, _LANE_INDEX.get(x), x, float(-cls.RADIUS * 2), speed, phase_rate=3.0,
+                         sprite=cls._kinds.index(kind))
+
+    @classmethod
+    def _build_frames(cls, kind, glow=True):
         col, label, _ = POWERUP_META[kind]
-        if not hasattr(PowerUp, "_labels"):
-            f = pg.font.Font(None, 16)
-            PowerUp._labels = {
-                k: f.render(meta[1][0], True, WHITE)
-                for k, meta in POWERUP_META.items()
-            }
-        self._label_surf = PowerUp._labels[kind]
-
-    def update(self, dt):
-        self.y     += self.speed * dt
-        self.angle += 3.0 * dt
-        return self.y > HEIGHT
-
-    def draw(self, surface):
-        col, label, _ = POWERUP_META[self.kind]
-        pulse = abs(math.sin(self.angle))
-        r     = int(self.RADIUS + 4 * pulse)
-        glow  = pg.Surface((r * 2 + 8, r * 2 + 8), pg.SRCALPHA)
-        pg.draw.circle(glow, (*col, 80), (r + 4, r + 4), r + 4)
-        surface.blit(glow, (int(self.x) - r - 4, int(self.y) - r - 4))
-        pg.draw.circle(surface, col, (int(self.x), int(self.y)), r)
-        pg.draw.circle(surface, WHITE, (int(self.x), int(self.y)), r, 2)
-        surface.blit(self._label_surf, self._label_surf.get_rect(center=(int(self.x), int(self.y))))
-
-    def get_rect(self):
-        return pg.Rect(self.x - self.RADIUS, self.y - self.RADIUS, self.RADIUS * 2, self.RADIUS * 2)
+        label_surf    = pg.font.Font(None, 16).render(label[0], True, WHITE)
+        c             = cls.RADIUS + cls.PULSE + 4
+
+        def build(phase):
+            r = int(cls.RADIUS + cls.PULSE * abs(math.sin(phase)))
+            s = pg.Surface((c * 2, c * 2), pg.SRCALPHA)
+            if glow:
+                pg.draw.circle(s, (*col, 80), (c, c), r + 4)
+            pg.draw.circle(s, col, (c, c), r)
+            pg.draw.circle(s, WHITE, (c, c), r, 2)
+            s.blit(label_surf, label_surf.get_rect(center=(c, c)))
+            return s
+        return SpriteCycle(build, _ANIM_FRAMES, math.pi)
+
+    @classmethod
+    def animation(cls, glow=True):
+        cycles = cls._cycles.get(glow)
+        if cycles is None:
+            cycles = cls._cycles[glow] = [cls._build_frames(k, glow) for k in cls._kinds]
+        return cycles
+
+    @classmethod
+    def draw(cls, surface, x, y, phase, sprite):
+        c = cls.RADIUS + cls.PULSE + 4
+        cycles = cls._cycles.get(cls.glow) or cls.animation(cls.glow)
+        return _DISPLAY.blit(surface, cycles[sprite].at(phase), (int(x) - c, int(y) - c))
+
+    @classmethod
+    def rect(cls, x, y, h):
+        return pg.Rect(x - cls.RADIUS, y - cls.RADIUS, cls.RADIUS * 2, cls.RADIUS * 2)
 
 
 class ObstacleCar:
-    _cache = {}
-    _MAX_CACHE = 64
-
-    def __init__(self, lane, speed):
-        self.width    = 48
-        self.height   = random.choice([82, 88, 94])
-        self.x        = float(LANE_CENTERS[lane] - self.width // 2)
-        self.y        = float(-self.height - 10)
-        self.speed    = speed
-        self.color    = random.choice(OBSTACLE_COLORS)
-        self.car_type = random.choice(["sedan", "suv", "truck"])
-        self.lane     = lane
-        key = (self.color, self.car_type, self.width, self.height)
-        if key not in ObstacleCar._cache:
-            if len(ObstacleCar._cache) >= ObstacleCar._MAX_CACHE:
-                ObstacleCar._cache.pop(next(iter(ObstacleCar._cache)))
-            s = pg.Surface((self.width + 8, self.height + 8), pg.SRCALPHA)
-            draw_car(s, 4, 4, self.width, self.height, self.color, (100, 100, 120), self.car_type)
-            ObstacleCar._cache[key] = s
-        self._surf = ObstacleCar._cache[key]
+    KIND    = ENTITY_CAR
+    WIDTH   = 48
+    HEIGHTS = (82, 88, 94)
+    CONSUMED_ON_HIT = False
+    _sprite_keys = []
+    _sprite_ids  = {}
+    _sprites     = {}
+
+    @classmethod
+    def spawn(cls, store, lane, speed, rng=random):
+        height   = rng.choice(cls.HEIGHTS)
+        color    = rng.choice(OBSTACLE_COLORS)
+        car_type = rng.choice(["sedan", "suv", "truck"])
+        key      = (color, car_type, cls.WIDTH, height)
+        sprite   = cls._sprite_ids.get(key)
+        if sprite is None:
+            sprite = cls._sprite_ids[key] = len(cls._sprite_keys)
+            cls._sprite_keys.append(key)
+        return store.add(cls.KIND, lane, float(LANE_CENTERS[lane] - cls.WIDTH // 2), float(-height - 10), speed,
+                         sprite=sprite, h=height)
+
+    @classmethod
+    def draw(cls, surface, x, y, phase, sprite):
+        surf = cls._sprites.get(sprite)
+        if surf is None:
+            color, car_type, w, h = cls._sprite_keys[sprite]
+            surf = cls._sprites[sprite] = _SCRATCH.track(pg.Surface((w + 8, h + 8), pg.SRCALPHA))
+            draw_car(surf, 4, 4, w, h, color, (100, 100, 120), car_type)
+        return _DISPLAY.blit(surface, surf, (int(x) - 4, int(y) - 4))
+
+    @classmethod
+    def rect(cls, x, y, h):
+        return pg.Rect(int(x) + 4, int(y) + 4, cls.WIDTH - 8, h - 8)
+
+
+_ENTITY_KINDS    = (ObstacleCar, Barrier, OilSlick, Coin, PowerUp)
+_ANIMATED        = (OilSlick, Coin, PowerUp)
+_ENTITY_GROUP    = np.array([GROUP_CARS, GROUP_MISC, GROUP_MISC, GROUP_COINS, GROUP_POWERUPS], np.int8)
+_ENTITY_CONSUMED = np.array([k.CONSUMED_ON_HIT for k in _ENTITY_KINDS])
+
+
+class Broadphase:
+    __slots__ = ("rect", "lane_lo", "lane_hi", "top", "bottom", "_reach", "_below", "_half_w")
 
-    def update(self, dt):
-        self.y += self.speed * dt
-        return self.y > HEIGHT
-
-    def draw(self, surface):
-        surface.blit(self._surf, (int(self.x) - 4, int(self.y) - 4))
-
-    def get_rect(self):
-        return pg.Rect(int(self.x) + 4, int(self.y) + 4, self.width - 8, self.height - 8)
+    def __init__(self):
+        self._reach  = max(max(ObstacleCar.HEIGHTS), Barrier.HEIGHT, OilSlick.HEIGHT) + 1
+        self._below  = max(Coin.RADIUS, PowerUp.RADIUS) + 1
+        self._half_w = max(ObstacleCar.WIDTH, Barrier.WIDTH, OilSlick.WIDTH, PowerUp.RADIUS * 2) // 2 + 1
+        self.rect    = None
+        self.lane_lo = 0
+        self.lane_hi = 0
+        self.top     = 0.0
+        self.bottom  = 0.0
+
+    def aim(self, rect):
+        reach        = rect.w / 2 + self._half_w
+        self.rect    = rect
+        self.top     = rect.top - self._reach
+        self.bottom  = rect.bottom + self._below
+        self.lane_lo = bisect_left(LANE_CENTERS, rect.centerx - reach)
+        self.lane_hi = bisect_left(LANE_CENTERS, rect.centerx + reach)
+
+
+class EntityStore:
+    __slots__ = ("kind", "group", "lane", "x", "y", "speed", "phase", "phase_rate", "sprite", "h", "seq", "active",
+                 "_motion", "_rate", "_prev", "_free", "_next_seq", "_near", "_gone", "_aim")
+
+    def __init__(self, capacity=64):
+        self.kind      = np.zeros(capacity, np.int8)
+        self.group     = np.zeros(capacity, np.int8)
+        self.lane      = np.zeros(capacity, np.int8)
+        self.x         = np.zeros(capacity)
+        self.sprite    = np.zeros(capacity, np.int32)
+        self.h         = np.zeros(capacity, np.int32)
+        self.seq       = np.zeros(capacity, np.int64)
+        self.active    = np.zeros(capacity, bool)
+        self._motion   = np.full((2, capacity), np.nan)
+        self._rate     = np.zeros((2, capacity))
+        self._prev     = self._motion
+        self.y, self.phase          = self._motion
+        self.speed, self.phase_rate = self._rate
+        self._free     = list(range(capacity - 1, -1, -1))
+        self._next_seq = 0
+        self._near     = []
+        self._gone     = []
+        self._aim      = None
+
+    def __len__(self):
+        return len(self.active) - len(self._free)
+
+    def clear(self):
+        self.active[:] = False
+        self.y[:]      = np.nan
+        self._free     = list(range(len(self.active) - 1, -1, -1))
+        self._next_seq = 0
+
+    def _grow(self):
+        old = len(self.active)
+        for name in ("kind", "group", "lane", "x", "sprite", "h", "seq", "active"):
+            arr = getattr(self, name)
+            setattr(self, name, np.concatenate((arr, np.zeros_like(arr))))
+        self._motion = np.concatenate((self._motion, np.full((2, old), np.nan)), axis=1)
+        self._rate   = np.concatenate((self._rate, np.zeros((2, old))), axis=1)
+        self._prev   = self._motion
+        self.y, self.phase          = self._motion
+        self.speed, self.phase_rate = self._rate
+        self._free.extend(range(old * 2 - 1, old - 1, -1))
+
+    def add(self, kind, lane, x, y, speed, phase=0.0, phase_rate=0.0, sprite=0, h=0):
+        if not self._free:
+            self._grow()
+        i = self._free.pop()
+        self.kind[i]       = kind
+        self.group[i]      = _ENTITY_GROUP[kind]
+        self.lane[i]       = lane
+        self.x[i]          = x
+        self.y[i]          = y
+        self.speed[i]      = speed
+        self.phase[i]      = phase
+        self.phase_rate[i] = phase_rate
+        self._prev[:, i]   = y, phase
+        self.sprite[i]     = sprite
+        self.h[i]          = h
+        self.seq[i]        = self._next_seq
+        self.active[i]     = True
+        self._next_seq    += 1
+        return i
+
+    def members(self, group):
+        idx = np.flatnonzero(self.active & (self.group == group))
+        return idx[np.argsort(self.seq[idx])] if len(idx) > 1 else idx
+
+    def rect(self, i):
+        return _ENTITY_KINDS[self.kind[i]].rect(self.x[i].item(), self.y[i].item(), self.h[i].item())
+
+    def advance(self, dt, broadphase):
+        self._prev   = self._motion
+        self._motion = self._motion + self._rate * dt
+        self.y, self.phase = self._motion
+        self._near   = near = []
+        self._gone   = gone = []
+        self._aim    = broadphase.rect
+        ahead = np.flatnonzero(self.y > broadphase.top)
+        if not len(ahead):
+            return
+        bottom = broadphase.bottom
+        lo, hi = broadphase.lane_lo, broadphase.lane_hi
+        for i, y, lane in zip(ahead.tolist(), self.y[ahead].tolist(), self.lane[ahead].tolist()):
+            if y > HEIGHT:
+                gone.append(i)
+            elif y < bottom and lo <= lane < hi:
+                near.append(i)
+        if len(near) > 1:
+            near.sort(key=self.seq.__getitem__)
+
+    def sweep(self, group, stop_on_hit=False):
+        hits = []
+        stop = None
+        for i in self._near:
+            if self.group[i] != group:
+                continue
+            kind = _ENTITY_KINDS[self.kind[i]]
+            if kind.rect(self.x[i].item(), self.y[i].item(), self.h[i].item()).colliderect(self._aim):
+                hits.append(i)
+                if stop_on_hit and not kind.CONSUMED_ON_HIT:
+                    stop = self.seq[i]
+                    break
+        if stop is not None:
+            held = self.active & ((self.group > group) | ((self.group == group) & (self.seq > stop)))
+            self._motion[:, held] = self._prev[:, held]
+        gone  = [i for i in self._gone if self.group[i] == group and (stop is None or self.seq[i] <= stop)]
+        eaten = [i for i in hits if _ENTITY_CONSUMED[self.kind[i]]]
+        if gone or eaten:
+            self._release(gone + eaten)
+        return len(gone), hits
+
+    def _release(self, idx):
+        self.active[idx] = False
+        self.speed[idx]  = np.nan
+        self._free.extend(idx)
+
+    def lanes(self, group):
+        return set(self.lane[self.active & (self.group == group)].tolist())
+
+    def draw(self, surface, alpha=1.0):
+        idx = np.flatnonzero(self.active)
+        idx = idx[np.lexsort((self.seq[idx], self.group[idx]))]
+        ys, phases = self._motion[:, idx]
+        if alpha < 1.0:
+            ys, phases = self._prev[:, idx] + (self._motion[:, idx] - self._prev[:, idx]) * alpha
+        return [_ENTITY_KINDS[kind].draw(surface, x, y, phase, sprite)
+                for kind, x, y, phase, sprite in zip(self.kind[idx].tolist(), self.x[idx].tolist(), ys.tolist(),
+                                                     phases.tolist(), self.sprite[idx].tolist())]
 
 
 class Road:
@@ -528,18 +1592,29 @@ class Road:
     ]
     RUMBLE_W      = 18
     RUMBLE_PERIOD = 50
+    RUMBLE_COLORS = (RED, (255, 200, 100))
+    BAND_COUNT    = 10
+    PERIOD        = 800
+    _pulse_level  = None
 
     def __init__(self, scroll_speed):
         self.scroll       = 0.0
+        self.prev_scroll  = 0.0
         self.scroll_speed = scroll_speed
-        self._base        = self._build_base()
-        self._stripe_surf = self._build_stripe_surf()
-
-    def _build_base(self):
-        global _ROAD_BASE_SURF
-        if _ROAD_BASE_SURF is not None:
-            return _ROAD_BASE_SURF
-
+        self._drawn_top   = None
+
+    @classmethod
+    def textures(cls):
+        global _ROAD_BASE_SURF, _ROAD_TEXTURE, _ROAD_SCALE
+        if _ROAD_BASE_SURF is None or _ROAD_SCALE != _DISPLAY.scale:
+            _ROAD_SCALE      = _DISPLAY.scale
+            _ROAD_BASE_SURF  = _DISPLAY.resample(cls._build_base())
+            _ROAD_TEXTURE    = cls._build_texture(_ROAD_SCALE)
+            cls._pulse_level = None
+        return _ROAD_BASE_SURF, _ROAD_TEXTURE
+
+    @classmethod
+    def _build_base(cls):
         grass = pg.Surface((ROAD_LEFT, HEIGHT))
         grass.fill(GRASS_COLOR)
         rng = random.Random(42)
@@ -553,75 +1628,144 @@ class Road:
         s = pg.Surface((WIDTH, HEIGHT))
         s.blit(grass, (0, 0))
         s.blit(pg.transform.flip(grass, True, False), (ROAD_RIGHT, 0))
-        pg.draw.rect(s, SHOULDER_COLOR, (ROAD_LEFT - 22, 0, 22, HEIGHT))
-        pg.draw.rect(s, SHOULDER_COLOR, (ROAD_RIGHT, 0, 22, HEIGHT))
-
-        road_w = ROAD_RIGHT - ROAD_LEFT
-        road_surface = pg.Surface((road_w, HEIGHT))
-        base_intensity = 35
-        stripe_count   = 10
-        stripe_h       = HEIGHT // stripe_count
-        for i in range(stripe_count + 1):
-            intensity = base_intensity + int(10 * math.sin(i / stripe_count * math.pi * 2))
-            y0 = i * stripe_h
-            y1 = min(y0 + stripe_h, HEIGHT)
-            pg.draw.rect(road_surface, (intensity, intensity, intensity + 5), (0, y0, road_w, y1 - y0))
-
-        s.blit(road_surface, (ROAD_LEFT, 0))
-        pg.draw.line(s, (255, 255, 100), (ROAD_LEFT, 0),  (ROAD_LEFT,  HEIGHT), 4)
-        pg.draw.line(s, (255, 255, 100), (ROAD_RIGHT, 0), (ROAD_RIGHT, HEIGHT), 4)
-        _ROAD_BASE_SURF = s
         return s
 
-    def _build_stripe_surf(self):
-        period = self.STRIPE_H + self.STRIPE_GAP
+    @classmethod
+    def _build_stripe_surf(cls):
+        period = cls.STRIPE_H + cls.STRIPE_GAP
         s      = pg.Surface((WIDTH, period), pg.SRCALPHA)
-        for lx in self.LANE_DIVIDERS:
-            glow = pg.Surface((self.STRIPE_W + 4, self.STRIPE_H), pg.SRCALPHA)
-            pg.draw.rect(glow, (100, 100, 150, 80), (0, 0, self.STRIPE_W + 4, self.STRIPE_H), border_radius=3)
+        for lx in cls.LANE_DIVIDERS:
+            glow = pg.Surface((cls.STRIPE_W + 4, cls.STRIPE_H), pg.SRCALPHA)
+            pg.draw.rect(glow, (100, 100, 150, 80), (0, 0, cls.STRIPE_W + 4, cls.STRIPE_H), border_radius=3)
             s.blit(glow, (lx - 2, 0))
-            pg.draw.rect(s, (180, 180, 200), (lx, 0, self.STRIPE_W, self.STRIPE_H), border_radius=2)
+            pg.draw.rect(s, (180, 180, 200), (lx, 0, cls.STRIPE_W, cls.STRIPE_H), border_radius=2)
         return s
 
-    def update(self, dt):
-        period      = self.STRIPE_H + self.STRIPE_GAP
-        self.scroll = (self.scroll + self.scroll_speed * dt) % period
-
-    def draw(self, surface):
-        surface.blit(self._base, (0, 0))
-
-        period  = self.RUMBLE_PERIOD
-        offset  = self.scroll % period
-        elapsed = pg.time.get_ticks() / 1000
-        pulse   = abs(math.sin(elapsed * 10))
+    @classmethod
+    def _build_texture(cls, scale=1.0):
+        band   = cls.dirty_rect()
+        x0     = band.x
+        period = cls.PERIOD
+        s      = pg.Surface((band.w, period))
+        s.fill(GRASS_COLOR)
+        pg.draw.rect(s, SHOULDER_COLOR, (ROAD_LEFT - 22 - x0, 0, 22, period))
+        pg.draw.rect(s, SHOULDER_COLOR, (ROAD_RIGHT - x0, 0, 22, period))
 
-        for i in range(HEIGHT // period + 2):
-            ry         = int(i * period - offset)
-            col        = RED if i % 2 == 0 else (255, 200, 100)
-            bright_col = tuple(clamp(c + int(50 * pulse), 0, 255) for c in col)
-            pg.draw.rect(surface, bright_col, (ROAD_LEFT - self.RUMBLE_W - 22, ry, self.RUMBLE_W, period // 2))
-            pg.draw.rect(surface, bright_col, (ROAD_RIGHT + 22, ry, self.RUMBLE_W, period // 2))
+        road_w = ROAD_RIGHT - ROAD_LEFT
+        band_h = period // cls.BAND_COUNT
+        for i in range(cls.BAND_COUNT):
+            intensity = 35 + int(10 * math.sin(i / cls.BAND_COUNT * math.pi * 2))
+            pg.draw.rect(s, (intensity, intensity, intensity + 5), (ROAD_LEFT - x0, i * band_h, road_w, band_h))
+        pg.draw.line(s, (255, 255, 100), (ROAD_LEFT - x0, 0),  (ROAD_LEFT - x0,  period), 4)
+        pg.draw.line(s, (255, 255, 100), (ROAD_RIGHT - x0, 0), (ROAD_RIGHT - x0, period), 4)
+
+        stripes = cls._build_stripe_surf()
+        for y in range(0, period, stripes.get_height()):
+            s.blit(stripes, (-x0, y))
+        for i in range(period // cls.RUMBLE_PERIOD):
+            col = cls.RUMBLE_COLORS[i % 2]
+            ry  = i * cls.RUMBLE_PERIOD
+            pg.draw.rect(s, col, (ROAD_LEFT - cls.RUMBLE_W - 22 - x0, ry, cls.RUMBLE_W, cls.RUMBLE_PERIOD // 2))
+            pg.draw.rect(s, col, (ROAD_RIGHT + 22 - x0, ry, cls.RUMBLE_W, cls.RUMBLE_PERIOD // 2))
+
+        rgb            = pg.surfarray.array3d(s).astype(np.uint32)
+        packed         = (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+        colors, pixels = np.unique(packed, return_inverse=True)
+        pixels         = pixels.reshape(packed.shape).astype(np.uint8)
+        if scale != 1.0:
+            w, h   = pixels.shape
+            pixels = pixels[(np.arange(round(w * scale)) / scale).astype(np.intp)]
+            pixels = pixels[:, (np.arange(round(h * scale)) / scale).astype(np.intp)]
+        texture = pg.surfarray.make_surface(pixels)
+        texture.set_palette([((c >> 16) & 255, (c >> 8) & 255, c & 255) for c in colors.tolist()])
+        slots = [int(np.searchsorted(colors, (r << 16) | (g << 8) | b)) for r, g, b in cls.RUMBLE_COLORS]
+        return texture, tuple(zip(slots, cls.RUMBLE_COLORS)), cls._motion(pixels, round(x0 * scale), scale)
+
+    @classmethod
+    def _motion(cls, pixels, x0, scale=1.0):
+        changed = pixels != np.roll(pixels, 1, axis=1)
+        edges   = np.flatnonzero(changed.sum(axis=0) > (ROAD_RIGHT - ROAD_LEFT) * scale // 2)
+        inner   = changed.copy()
+        inner[:, edges] = False
+        dynamic = inner.any(axis=1)
+        bounds  = np.flatnonzero(np.diff(np.concatenate(([0], dynamic.view(np.int8), [0]))))
+        height  = round(HEIGHT * scale)
+        columns = tuple(pg.Rect(x0 + a, 0, b - a, height) for a, b in bounds.reshape(-1, 2).tolist())
+        swept   = np.flatnonzero(changed[:, edges].any(axis=1) & ~dynamic)
+        span    = (x0 + int(swept[0]), int(swept[-1] - swept[0]) + 1) if len(swept) else (x0, 0)
+        return RoadMotion(columns, edges, span)
+
+    @classmethod
+    def dirty_rect(cls):
+        margin = cls.RUMBLE_W + 22
+        return pg.Rect(ROAD_LEFT - margin, 0, ROAD_RIGHT - ROAD_LEFT + 2 * margin, HEIGHT)
 
-        sp = self.STRIPE_H + self.STRIPE_GAP
-        so = int(self.scroll % sp)
-        y  = -sp + so
-        while y < HEIGHT:
-            surface.blit(self._stripe_surf, (0, y))
-            y += sp
+    def update(self, dt):
+        self.prev_scroll = self.scroll
+        self.scroll      = (self.scroll + self.scroll_speed * dt) % self.PERIOD
+
+    def render_scroll(self, alpha):
+        return self.prev_scroll + (self.scroll - self.prev_scroll) % self.PERIOD * alpha
+
+    def _pulse(self, texture, rumble):
+        level = int(50 * abs(math.sin(pg.time.get_ticks() / 1000 * 10)))
+        if level != Road._pulse_level:
+            Road._pulse_level = level
+            for slot, col in rumble:
+                texture.set_palette_at(slot, tuple(clamp(c + level, 0, 255) for c in col))
+
+    def _changed(self, motion, prev, top, period, height):
+        if prev is None:
+            return None
+        delta = (prev - top) % period
+        if delta > height // 4:
+            return None
+        rects = list(motion.columns)
+        if delta:
+            x, w = motion.span
+            for y in ((motion.edges - prev) % period).tolist():
+                if y < height:
+                    rects.append(pg.Rect(x, y, w, min(delta, height - y)))
+                if y + delta > period:
+                    rects.append(pg.Rect(x, 0, w, y + delta - period))
+        return rects
+
+    def draw(self, surface, alpha=1.0):
+        base, (texture, rumble, motion) = self.textures()
+        self._pulse(texture, rumble)
+        width, height = surface.get_size()
+        band_w, period = texture.get_size()
+        x     = round(self.dirty_rect().x * _ROAD_SCALE)
+        right = x + band_w
+        surface.blit(base, (0, 0), (0, 0, x, height))
+        surface.blit(base, (right, 0), (right, 0, width - right, height))
+
+        top   = -int(self.render_scroll(alpha) * _ROAD_SCALE) % period
+        first = min(height, period - top)
+        surface.blit(texture, (x, 0), (0, top, band_w, first))
+        if first < height:
+            surface.blit(texture, (x, first), (0, 0, band_w, height - first))
+        rects, self._drawn_top = self._changed(motion, self._drawn_top, top, period, height), top
+        return rects
 
 
 class Player:
     WIDTH  = 48
     HEIGHT = 88
     SPEED  = 400
+    TILT_STEP  = 0.5
+    TILT_RANGE = 18.0
+    _sprites   = {}
 
-    def __init__(self, skin, speed_level=0, extra_lives=0):
+    def __init__(self, skin, speed_level=0, extra_lives=0, rng=random):
         self.x                = float(WIDTH // 2 - self.WIDTH // 2)
         self.y                = float(HEIGHT - self.HEIGHT - 30)
+        self.prev_x           = self.x
         self.color            = skin.color
         self.car_type         = skin.type
         self.speed_bonus      = skin.speed_bonus + speed_level * UPGRADE_SPEED_STEP
         self.extra_lives      = extra_lives
+        self.rng              = rng
         self.vel_x            = 0.0
         self.tilt             = 0.0
         self.slide_vel        = 0.0
@@ -630,17 +1774,37 @@ class Player:
         self.boost_timer      = 0.0
         self.boost_multiplier = 1.0
         self._powerup_timers  = {POWERUP_SHIELD: 0.0, POWERUP_TIMEFREEZE: 0.0}
-        self._surf            = pg.Surface((self.WIDTH + 12, self.HEIGHT + 12), pg.SRCALPHA)
-        self._cached_surf     = None
-        self._cache_key       = None
-        self._prerender()
-
-    def _prerender(self):
-        key = (self.color, self.car_type)
-        if self._cache_key != key:
-            self._cached_surf = pg.Surface((self.WIDTH + 12, self.HEIGHT + 12), pg.SRCALPHA)
-            draw_car(self._cached_surf, 6, 6, self.WIDTH, self.HEIGHT, self.color, CYAN, self.car_type, player=True)
-            self._cache_key = key
+        self._cached_surf     = self._sprite(("car", self.color, self.car_type), self._build_car)
+
+    @classmethod
+    def _sprite(cls, key, build):
+        surf = cls._sprites.get(key)
+        if surf is None:
+            surf = cls._sprites[key] = _SCRATCH.track(build())
+        return surf
+
+    def _build_car(self):
+        surf = pg.Surface((self.WIDTH + 12, self.HEIGHT + 12), pg.SRCALPHA)
+        draw_car(surf, 6, 6, self.WIDTH, self.HEIGHT, self.color, CYAN, self.car_type, player=True)
+        return surf
+
+    def _tilted(self):
+        step = round(clamp(self.tilt, -self.TILT_RANGE, self.TILT_RANGE) / self.TILT_STEP)
+        return self._sprite(("tilt", self.color, self.car_type, step),
+                            lambda: pg.transform.rotate(self._cached_surf, -step * self.TILT_STEP))
+
+    @classmethod
+    def _build_shield(cls):
+        surf = pg.Surface((cls.WIDTH + 28, cls.HEIGHT + 28), pg.SRCALPHA)
+        pg.draw.ellipse(surf, (80, 180, 255, 120), surf.get_rect())
+        pg.draw.ellipse(surf, (80, 180, 255), (4, 4, cls.WIDTH + 20, cls.HEIGHT + 20), 3)
+        return surf
+
+    @classmethod
+    def _build_boost(cls):
+        surf = pg.Surface((cls.WIDTH + 20, cls.HEIGHT + 20), pg.SRCALPHA)
+        pg.draw.ellipse(surf, (255, 100, 0, 100), surf.get_rect())
+        return surf
 
     def apply_powerup(self, kind):
         _, _, duration = POWERUP_META[kind]
@@ -652,7 +1816,7 @@ class Player:
     def apply_oil(self):
         if self.hazard_lockout > 0:
             return
-        self.slide_vel      = random.choice([-1, 1]) * self.SPEED * 1.2
+        self.slide_vel      = self.rng.choice([-1, 1]) * self.SPEED * 1.2
         self.slide_timer    = 1.0
         self.hazard_lockout = 1.0
 
@@ -660,7 +1824,8 @@ class Player:
         self.boost_timer      = 1.5
         self.boost_multiplier = 1.8
 
-    def update(self, dt, keys, rain_grip_penalty=0.0):
+    def update(self, dt, left, right, rain_grip_penalty=0.0):
+        self.prev_x = self.x
         if self.boost_timer > 0:
             self.boost_timer -= dt
         else:
@@ -677,9 +1842,9 @@ class Player:
         else:
             accel = 1200 * (1.0 - rain_grip_penalty)
             decel = 800 * (1.0 - rain_grip_penalty)
-            if keys[pg.K_LEFT]:
+            if left:
                 self.vel_x = max(self.vel_x - accel * dt, -self.SPEED)
-            elif keys[pg.K_RIGHT]:
+            elif right:
                 self.vel_x = min(self.vel_x + accel * dt, self.SPEED)
             else:
                 if self.vel_x:
@@ -700,27 +1865,24 @@ class Player:
             factor *= self.boost_multiplier
         return factor
 
-    def draw(self, surface, invincible, ticks):
+    def draw(self, surface, invincible, ticks, glow=True, alpha=1.0):
         if invincible and not self.has_powerup(POWERUP_SHIELD) and (ticks // 60) % 2 == 0:
             return
-        cx = int(self.x + self.WIDTH // 2)
-        cy = int(self.y + self.HEIGHT // 2)
-        if self.has_powerup(POWERUP_SHIELD):
-            glow = pg.Surface((self.WIDTH + 28, self.HEIGHT + 28), pg.SRCALPHA)
-            pg.draw.ellipse(glow, (80, 180, 255, 120), glow.get_rect())
-            surface.blit(glow, (int(self.x) - 14, int(self.y) - 14))
-            pg.draw.ellipse(surface, (80, 180, 255), (int(self.x) - 10, int(self.y) - 10, self.WIDTH + 20, self.HEIGHT + 20), 3)
-        if self.boost_timer > 0:
-            glow = pg.Surface((self.WIDTH + 20, self.HEIGHT + 20), pg.SRCALPHA)
-            pg.draw.ellipse(glow, (255, 100, 0, 100), glow.get_rect())
-            surface.blit(glow, (int(self.x) - 10, int(self.y) - 10))
+        x  = int(self.prev_x + (self.x - self.prev_x) * alpha)
+        y  = int(self.y)
+        cx = x + self.WIDTH // 2
+        cy = y + self.HEIGHT // 2
+        rects = []
+        if glow and self.has_powerup(POWERUP_SHIELD):
+            rects.append(_DISPLAY.blit(surface, self._sprite("shield", self._build_shield), (x - 14, y - 14)))
+        if glow and self.boost_timer > 0:
+            rects.append(_DISPLAY.blit(surface, self._sprite("boost", self._build_boost), (x - 10, y - 10)))
         if abs(self.tilt) > 0.3:
-            self._surf.fill((0, 0, 0, 0))
-            self._surf.blit(self._cached_surf, (0, 0))
-            rot = pg.transform.rotate(self._surf, -self.tilt)
-            surface.blit(rot, rot.get_rect(center=(cx, cy)))
+            rot = self._tilted()
+            rects.append(_DISPLAY.blit(surface, rot, rot.get_rect(center=(cx, cy))))
         else:
-            surface.blit(self._cached_surf, (int(self.x) - 6, int(self.y) - 6))
+            rects.append(_DISPLAY.blit(surface, self._cached_surf, (x - 6, y - 6)))
+        return rects[0].unionall(rects[1:])
 
     def get_rect(self):
         m = 6
@@ -732,13 +1894,6 @@ class HUD:
         self.small = fonts[1]
         self.tiny  = fonts[2]
         self.surf  = pg.Surface((240, 195), pg.SRCALPHA)
-        self._text_cache = {}
-
-    def _render(self, font, text, color):
-        key = (id(font), text, color)
-        if key not in self._text_cache:
-            self._text_cache[key] = font.render(text, True, color)
-        return self._text_cache[key]
 
     def draw(self, surface, score, level, speed_pct, difficulty, multiplier, lives, max_lives, boost_timer, player, weather):
         self.surf.fill((0, 0, 0, 180))
@@ -778,13 +1933,12 @@ class HUD:
         if weather != WEATHER_CLEAR:
             wcol = (140, 170, 220)
             self._blit(weather.upper(), wcol, 12, 182, tiny=True)
-        surface.blit(self.surf, (10, 10))
+        return _DISPLAY.blit_rescaled(surface, self.surf, (10, 10), "hud_view")
 
     def _blit(self, text, color, x, y, tiny=False):
         if isinstance(color, tuple):
             color = tuple(int(clamp(c, 0, 255)) for c in color)
-        font = self.tiny if tiny else self.small
-        self.surf.blit(self._render(font, text, color), (x, y))
+        _TEXT.draw(self.surf, self.tiny if tiny else self.small, text, color, (x, y))
 
 
 class Button:
@@ -796,44 +1950,419 @@ class Button:
         self.enabled      = True
 
     def draw(self, surface, font):
-        hovered = self.rect.collidepoint(pg.mouse.get_pos())
+        hovered = self.rect.collidepoint(_DISPLAY.mouse_pos())
         if not self.enabled:
             col = (60, 60, 60)
         else:
             col = self.hover_color if hovered else self.base_color
+        rect   = _DISPLAY.rect(self.rect)
+        radius = _DISPLAY.length(8)
+        pad    = _DISPLAY.length(5)
         if hovered and self.enabled:
-            glow = pg.Surface((self.rect.w + 10, self.rect.h + 10), pg.SRCALPHA)
-            pg.draw.rect(glow, (*col, 80), (0, 0, self.rect.w + 10, self.rect.h + 10), border_radius=10)
-            surface.blit(glow, (self.rect.x - 5, self.rect.y - 5))
-        pg.draw.rect(surface, (0, 0, 0), (self.rect.x + 3, self.rect.y + 4, self.rect.w, self.rect.h), border_radius=8)
-        pg.draw.rect(surface, col, self.rect, border_radius=8)
-        pg.draw.rect(surface, WHITE, self.rect, 2, border_radius=8)
+            glow = _SCRATCH.get("button_glow", (rect.w + pad * 2, rect.h + pad * 2), _CLEAR)
+            pg.draw.rect(glow, (*col, 80), glow.get_rect(), border_radius=_DISPLAY.length(10))
+            surface.blit(glow, (rect.x - pad, rect.y - pad))
+        shadow = rect.move(_DISPLAY.length(3), _DISPLAY.length(4))
+        pg.draw.rect(surface, (0, 0, 0), shadow, border_radius=radius)
+        pg.draw.rect(surface, col, rect, border_radius=radius)
+        pg.draw.rect(surface, WHITE, rect, _DISPLAY.length(2), border_radius=radius)
         text_col = WHITE if self.enabled else (140, 140, 140)
-        t = font.render(self.text, True, text_col)
-        surface.blit(t, t.get_rect(center=self.rect.center))
+        t = _TEXT.render(font, self.text, text_col)
+        _DISPLAY.blit(surface, t, t.get_rect(center=self.rect.center))
+        return rect.inflate(pad * 2, pad * 2).union(shadow)
 
     def clicked(self, pos):
         return self.enabled and self.rect.collidepoint(pos)
 
 
+HIGH_SCORE_PATH = "highscore.txt"
+PROGRESS_PATH   = "progress.txt"
+
+_LEGACY_HIGH_SCORE = re.compile(r"-?\d+")
+_LEGACY_PROGRESS   = re.compile(r"-?\d+,-?\d+,-?\d+")
+
+
+def _encode_save(text):
+    return f"{text}\n{zlib.crc32(text.encode()):08x}\n"
+
+
+def _decode_save(data, legacy=None):
+    data  = data.strip()
+    lines = data.split("\n")
+    if len(lines) == 2 and lines[1].strip() == f"{zlib.crc32(lines[0].encode()):08x}":
+        return lines[0]
+    if legacy is not None and legacy.fullmatch(data):
+        return data
+    return None
+
+
+def _fsync_dir(path):
+    try:
+        fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_save(path, text):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(_encode_save(text))
+        f.flush()
+        os.fsync(f.fileno())
+    if os.path.exists(path):
+        os.replace(path, path + ".bak")
+    os.replace(tmp, path)
+    _fsync_dir(path)
+
+
+def read_save(path, legacy=None):
+    for candidate in (path, path + ".bak"):
+        try:
+            with open(candidate) as f:
+                text = _decode_save(f.read(), legacy)
+        except (OSError, UnicodeDecodeError):
+            continue
+        if text is not None:
+            return text
+    return None
+
+
+class BackgroundWriter:
+    THREAD_NAME = "writer"
+
+    def __init__(self, pending, process):
+        self._pending = pending
+        self._process = process
+        self._busy    = False
+        self._cond    = threading.Condition()
+        self._thread  = None
+        self._failure = None
+        self.writes   = 0
+        self.errors   = 0
+
+    def _wake(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=self.THREAD_NAME, daemon=True)
+            self._thread.start()
+        self._cond.notify_all()
+
+    def flush(self, timeout=2.0):
+        with self._cond:
+            done = self._cond.wait_for(lambda: not self._pending and not self._busy, timeout)
+            failure, self._failure = self._failure, None
+        if failure is not None:
+            raise failure
+        return done
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending)
+                batch, self._pending = self._pending, type(self._pending)()
+                self._busy = True
+            try:
+                self._process(batch)
+            except (OSError, sqlite3.Error):
+                self.errors += 1
+            except Exception as e:
+                # Anything else is a bug in the batch handler; keep the thread alive and raise it from flush().
+                self.errors  += 1
+                self._failure = e
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+
+class SaveWriter(BackgroundWriter):
+    THREAD_NAME = "save-writer"
+
+    def __init__(self, write=write_save):
+        super().__init__({}, self._write_batch)
+        self._write = write
+
+    def save(self, path, text):
+        with self._cond:
+            self._pending[path] = text
+            self._wake()
+
+    def _write_batch(self, batch):
+        for path, text in batch.items():
+            try:
+                self._write(path, text)
+                self.writes += 1
+            except OSError:
+                self.errors += 1
+
+
+_SAVES = SaveWriter()
+
+RUN_HISTORY_PATH = "runs.db"
+
+_HISTORY_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS runs (
+        id          INTEGER PRIMARY KEY,
+        played_at   REAL    NOT NULL,
+        difficulty  TEXT    NOT NULL,
+        skin        INTEGER NOT NULL,
+        score       INTEGER NOT NULL,
+        level       INTEGER NOT NULL,
+        coins       INTEGER NOT NULL,
+        duration    REAL    NOT NULL,
+        speed_level INTEGER NOT NULL,
+        life_level  INTEGER NOT NULL,
+        seed        INTEGER NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS runs_score ON runs (score)",
+    "CREATE INDEX IF NOT EXISTS runs_diff_score ON runs (difficulty, score)",
+    "CREATE INDEX IF NOT EXISTS runs_board ON runs (difficulty, skin, score)",
+    "CREATE INDEX IF NOT EXISTS runs_recent ON runs (difficulty, id)",
+    "CREATE INDEX IF NOT EXISTS runs_recent_skin ON runs (difficulty, skin, id)",
+    "CREATE INDEX IF NOT EXISTS runs_skin_score ON runs (skin, score)",
+    "CREATE INDEX IF NOT EXISTS runs_skin_recent ON runs (skin, id)",
+)
+_COUNTS_SCHEMA = """CREATE TABLE run_counts (
+    difficulty TEXT    NOT NULL,
+    skin       INTEGER NOT NULL,
+    runs       INTEGER NOT NULL,
+    PRIMARY KEY (difficulty, skin)
+) WITHOUT ROWID"""
+_HISTORY_COLUMNS = ", ".join(HistoryRow._fields)
+
+
+class RunHistory(BackgroundWriter):
+    THREAD_NAME = "run-history"
+
+    def __init__(self, path=RUN_HISTORY_PATH):
+        super().__init__([], self._insert_batch)
+        self.path    = path
+        self._writer = None
+        self._reader = None
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=5.0)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        with db:
+            for statement in _HISTORY_SCHEMA:
+                db.execute(statement)
+            if db.execute("SELECT 1 FROM sqlite_master WHERE name = 'run_counts'").fetchone() is None:
+                db.execute(_COUNTS_SCHEMA)
+                db.execute("INSERT INTO run_counts SELECT difficulty, skin, COUNT(*) FROM runs GROUP BY difficulty, skin")
+        return db
+
+    def record(self, row):
+        with self._cond:
+            self._pending.append(tuple(row))
+            self._wake()
+
+    def _insert_batch(self, batch):
+        try:
+            if self._writer is None:
+                self._writer = self._connect()
+            with self._writer:
+                self._writer.executemany(
+                    f"INSERT INTO runs ({_HISTORY_COLUMNS}) VALUES ({', '.join('?' * len(HistoryRow._fields))})", batch)
+                counts = Counter((row[1], row[2]) for row in batch)
+                self._writer.executemany(
+                    "INSERT INTO run_counts VALUES (?, ?, ?) "
+                    "ON CONFLICT (difficulty, skin) DO UPDATE SET runs = runs + excluded.runs",
+                    [(*key, n) for key, n in counts.items()])
+            self.writes += len(batch)
+        except sqlite3.Error:
+            self.errors += len(batch)
+
+    def _query(self, sql, params=()):
+        if self._reader is None:
+            self._reader = self._connect()
+        return self._reader.execute(sql, params)
+
+    @staticmethod
+    def _where(difficulty, skin):
+        terms, params = [], []
+        if difficulty is not None:
+            terms.append("difficulty = ?")
+            params.append(difficulty)
+        if skin is not None:
+            terms.append("skin = ?")
+            params.append(skin)
+        return (" WHERE " + " AND ".join(terms)) if terms else "", params
+
+    def count(self, difficulty=None, skin=None):
+        where, params = self._where(difficulty, skin)
+        return self._query(f"SELECT COALESCE(SUM(runs), 0) FROM run_counts{where}", params).fetchone()[0]
+
+    def top(self, n=10, difficulty=None, skin=None):
+        where, params = self._where(difficulty, skin)
+        rows = self._query(f"SELECT {_HISTORY_COLUMNS} FROM runs{where} ORDER BY score DESC LIMIT ?", (*params, n))
+        return [HistoryRow(*r) for r in rows]
+
+    def best(self, difficulty=None, skin=None):
+        where, params = self._where(difficulty, skin)
+        return self._query(f"SELECT MAX(score) FROM runs{where}", params).fetchone()[0] or 0
+
+    def rolling_average(self, n=20, difficulty=None, skin=None):
+        where, params = self._where(difficulty, skin)
+        return self._query(f"SELECT AVG(score) FROM (SELECT score FROM runs{where} ORDER BY id DESC LIMIT ?)",
+                           (*params, n)).fetchone()[0]
+
+
+class Replay:
+    _MAGIC   = b"ARRP"
+    _VERSION = 1
+    _HEADER  = struct.Struct("<4sHIBBBBdIIHId")
+
+    def __init__(self, seed, difficulty, skin, upgrades, dt=SIM_DT):
+        self.seed       = seed
+        self.difficulty = difficulty
+        self.skin       = skin
+        self.upgrades   = dict(upgrades)
+        self.dt         = dt
+        self.inputs     = bytearray()
+        self.result     = None
+
+    def __len__(self):
+        return len(self.inputs)
+
+    def record(self, inp):
+        self.inputs.append(inp.left | inp.right << 1 | inp.boost << 2)
+
+    def controller(self):
+        it = iter(self.inputs)
+
+        def play(game):
+            b = next(it, 0)
+            return SimInput(bool(b & 1), bool(b & 2), bool(b & 4))
+        return play
+
+    def finish(self, game):
+        self.result = (game.score, game.level, game.run_coins, game.player.x)
+
+    def save(self, path):
+        score, level, coins, player_x = self.result or (0, 0, 0, 0.0)
+        header = self._HEADER.pack(
+            self._MAGIC, self._VERSION, self.seed, list(DIFFICULTY).index(self.difficulty), self.skin,
+            self.upgrades["speed"], self.upgrades["life"], self.dt, len(self.inputs), score, level, coins, player_x,
+        )
+        with open(path, "wb") as f:
+            f.write(header + zlib.compress(bytes(self.inputs), 9))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        (magic, version, seed, diff_idx, skin, speed_level, life_level,
+         dt, ticks, score, level, coins, player_x) = cls._HEADER.unpack_from(data)
+        if magic != cls._MAGIC or version != cls._VERSION:
+            raise ValueError(f"{path}: not a version {cls._VERSION} replay")
+        replay        = cls(seed, list(DIFFICULTY)[diff_idx], skin, {"speed": speed_level, "life": life_level}, dt)
+        replay.inputs = bytearray(zlib.decompress(data[cls._HEADER.size:]))
+        if len(replay.inputs) != ticks:
+            raise ValueError(f"{path}: expected {ticks} ticks, found {len(replay.inputs)}")
+        replay.result = (score, level, coins, player_x)
+        return replay
+
+
+def replay_path(base, seed):
+    stem, ext = os.path.splitext(base)
+    n = 1
+    while os.path.exists(f"{stem}-{seed}-{n}{ext}"):
+        n += 1
+    return f"{stem}-{seed}-{n}{ext}"
+
+
+def _lane_of(x):
+    return min(range(len(LANE_CENTERS)), key=lambda i: abs(LANE_CENTERS[i] - x))
+
+
+def autopilot(game):
+    p       = game.player
+    px      = p.x + Player.WIDTH / 2
+    top     = p.y - 260
+    blocked = set()
+    store   = game.entities
+    for group in (GROUP_CARS, GROUP_MISC):
+        for i in store.members(group).tolist():
+            r = store.rect(i)
+            if r.bottom > top and r.top < p.y + Player.HEIGHT:
+                blocked.add(_lane_of(r.centerx))
+    lanes  = sorted(range(len(LANE_CENTERS)), key=lambda i: abs(LANE_CENTERS[i] - px))
+    target = next((i for i in lanes if i not in blocked), lanes[0])
+    dx     = LANE_CENTERS[target] - (px + p.vel_x * 0.15)
+    return SimInput(dx < -8, dx > 8, False)
+
+
 class Game:
-    def __init__(self):
-        self.screen         = pg.display.set_mode((WIDTH, HEIGHT))
-        pg.display.set_caption("HIGH SPEED RACER - Extreme Edition")
+    def __init__(self, headless=False, seed=None, record_path=None, dirty_rects=False, alloc_report=False,
+                 profile=False, profile_path=None, startup_report=False, startup_budget=None,
+                 window_size=(WIDTH, HEIGHT), fullscreen=False, smooth_scale=False, quality="auto", render_fps=FPS,
+                 internal_res=(WIDTH, HEIGHT), persist=True):
+        init_pygame(headless)
+        self.headless       = headless
+        self.persist        = persist and not headless
+        self.startup_report = startup_report
+        self.startup_budget = startup_budget
+        self.dirty_rects    = dirty_rects
+        self.alloc_report   = alloc_report
+        self.profiler       = FrameProfiler(enabled=profile or bool(profile_path))
+        self.profile_path   = profile_path
+        self.render_fps     = render_fps
+        self.quality        = QualityGovernor(quality, 1.0 / (render_fps or FPS))
+        PowerUp.glow        = self.quality.level.glow
+        self._show_profiler = profile
+        self._profile_font  = None
+        self._last_rects    = None
+        self._overlay_key   = None
+        self.record_path    = record_path
+        self._seed_source   = random.Random(seed)
+        self._replay        = None
         self.clock          = pg.time.Clock()
-        self.fonts          = (pg.font.Font(None, 48), pg.font.Font(None, 32), pg.font.Font(None, 24))
         self.selected_skin  = 0
         self.selected_diff  = "Medium"
         self.state          = "menu"
-        self.hud            = HUD(self.fonts)
+        self._controller    = None
         self._init_ui()
-        self._blur_surf     = pg.Surface((WIDTH, HEIGHT), pg.SRCALPHA)
-        self._particle_pool = ParticlePool(_PARTICLE_POOL_SIZE)
-        self._rain_pool      = RainPool(_RAIN_POOL_SIZE)
-        self._prerender_blur_lines()
-        self.sounds         = _build_sounds()
-        self._high_score    = self._load_high_score()
-        self._wallet, self._upgrades = self._load_progress()
+        self._fx_rng        = np.random.default_rng()
+        self._particle_pool = ParticlePool(_PARTICLE_POOL_SIZE, _PARTICLE_OVERFLOW)
+        self._broadphase    = Broadphase()
+        self.entities       = EntityStore()
+        self._rain_pool     = RainPool(_RAIN_POOL_SIZE, self._fx_rng)
+        if headless:
+            self.screen      = None
+            self.fonts       = None
+            self.hud         = None
+            self.sounds      = _dummy_sounds()
+            self.history     = None
+            self._high_score = 0
+            self._wallet, self._upgrades = 0, {"speed": 0, "life": 0}
+        else:
+            _STARTUP.mark("pygame")
+            self.screen         = _DISPLAY.open(window_size, fullscreen, smooth_scale, internal_res)
+            pg.display.set_caption("HIGH SPEED RACER - Extreme Edition")
+            _STARTUP.mark("display")
+            self.fonts          = (pg.font.Font(None, 48), pg.font.Font(None, 32), pg.font.Font(None, 24))
+            self.hud            = HUD(self.fonts)
+            _STARTUP.mark("fonts")
+            self._blur_surf     = None
+            self._blur_lines    = None
+            self._blur_rects    = None
+            self._menu_layer    = UILayer()
+            self._garage_layer  = UILayer()
+            self._overlay_layer = UILayer(opaque=True, logical=False)
+            self.sounds         = None
+            self.history        = RunHistory() if self.persist else None
+            _STARTUP.mark("ui")
+            self._high_score    = self._load_high_score() if self.persist else 0
+            self._wallet, self._upgrades = self._load_progress() if self.persist else (0, {"speed": 0, "life": 0})
+            self._warmups       = [("sounds", self._load_sounds), ("road", Road.textures), ("blur", self._blur_layers)]
+            self._warmups      += [(kind.__name__.lower(), kind.animation) for kind in _ANIMATED]
+            _STARTUP.mark("save_data")
         self._reset_state()
 
     def _init_ui(self):
@@ -867,30 +2396,53 @@ class Game:
         if include_quit:
             self.btn_quit.rect = pg.Rect(bx, by + 252, bw, 46)
 
-    def _prerender_blur_lines(self):
-        self._blur_lines = pg.Surface((WIDTH, HEIGHT), pg.SRCALPHA)
-        for i in range(30):
-            lx = ROAD_LEFT + (ROAD_RIGHT - ROAD_LEFT) * i // 30
-            pg.draw.line(self._blur_lines, (255, 255, 255, 8), (lx, 0), (lx, HEIGHT), 2)
+    def _blur_layers(self):
+        size = self.screen.get_size()
+        if self._blur_lines is None or self._blur_lines.get_size() != size:
+            self._blur_surf  = pg.Surface(size, pg.SRCALPHA)
+            self._blur_lines = pg.Surface(size, pg.SRCALPHA)
+            self._blur_rects = []
+            width = _DISPLAY.length(2)
+            for i in range(30):
+                lx, _ = _DISPLAY.point((ROAD_LEFT + (ROAD_RIGHT - ROAD_LEFT) * i // 30, 0))
+                line  = pg.draw.line(self._blur_lines, (255, 255, 255, 8), (lx, 0), (lx, size[1]), width)
+                self._blur_rects.append(line)
+        return self._blur_surf, self._blur_lines
+
+    def _load_sounds(self):
+        if self.sounds is None:
+            self.sounds = _build_sounds()
+        return self.sounds
 
     def _play_sound(self, name):
-        self.sounds[name].play()
-
-    def _reset_state(self):
+        (self.sounds or self._load_sounds())[name].play()
+
+    def _startup_step(self, frame):
+        if frame == 1:
+            _STARTUP.mark("first_frame")
+            if self.startup_report or _STARTUP.over_budget(self.startup_budget):
+                print(_STARTUP.report(self.startup_budget))
+        elif self._warmups:
+            _STARTUP.timed(*self._warmups.pop(0))
+            if not self._warmups and self.startup_report:
+                print(_STARTUP.report_deferred())
+
+    def _reset_state(self, seed=None):
+        self._save_replay()
+        self.run_seed            = self._seed_source.getrandbits(32) if seed is None else seed
+        self.rng                 = random.Random(self.run_seed)
         diff                     = DIFFICULTY[self.selected_diff]
         skin                     = CAR_SKINS[self.selected_skin]
         speed_level              = self._upgrades.get("speed", 0)
         life_level               = self._upgrades.get("life", 0)
         self.base_lives          = 3 + life_level
-        self.player              = Player(skin, speed_level=speed_level, extra_lives=life_level)
+        self.player              = Player(skin, speed_level=speed_level, extra_lives=life_level, rng=self.rng)
         self.road                = Road(diff.base_speed)
-        self.obs_cars            = []
-        self.obs_misc            = []
-        self.coins               = []
-        self.powerups            = []
-        self._particle_pool._active.clear()
+        self.entities.clear()
+        self._particle_pool.clear()
         self.score               = 0
         self.run_coins           = 0
+        self.run_time            = 0.0
         self.level               = 1
         self.speed_pct           = 100
         self.scroll_speed        = diff.base_speed
@@ -910,64 +2462,148 @@ class Game:
         self.level_flash_timer   = 0.0
         self.speed_blur_alpha    = 0.0
         self.weather             = WEATHER_CLEAR
-        self.weather_timer       = random.uniform(20.0, 40.0)
+        self.rain_intensity      = 0.0
+        self.weather_timer       = self.rng.uniform(20.0, 40.0)
+        self._boost_requested    = False
+        if self.record_path:
+            self._replay = Replay(self.run_seed, self.selected_diff, self.selected_skin, self._upgrades)
 
     def _load_high_score(self):
         try:
-            with open("highscore.txt") as f:
-                value = f.read().strip()
-            score = int(value)
-            if score < 0:
-                return 0
-            return score
-        except FileNotFoundError:
-            return 0
-        except (ValueError, OSError):
+            return max(0, int(read_save(HIGH_SCORE_PATH, _LEGACY_HIGH_SCORE)))
+        except (TypeError, ValueError):
             return 0
 
     def _save_high_score(self):
         self._high_score = max(self.score, self._high_score)
-        try:
-            with open("highscore.txt", "w") as f:
-                f.write(str(self._high_score))
-        except OSError:
-            pass
+        if not self.persist:
+            return
+        _SAVES.save(HIGH_SCORE_PATH, str(self._high_score))
 
     def _load_progress(self):
         wallet, speed_level, life_level = 0, 0, 0
         try:
-            with open("progress.txt") as f:
-                parts = f.read().strip().split(",")
+            parts = read_save(PROGRESS_PATH, _LEGACY_PROGRESS).split(",")
             if len(parts) >= 3:
                 wallet      = max(0, int(parts[0]))
                 speed_level = clamp(int(parts[1]), 0, UPGRADE_SPEED_MAX_LEVEL)
                 life_level  = clamp(int(parts[2]), 0, UPGRADE_LIFE_MAX_LEVEL)
-        except FileNotFoundError:
-            pass
-        except (ValueError, OSError):
+        except (AttributeError, ValueError):
             pass
         return wallet, {"speed": speed_level, "life": life_level}
 
     def _save_progress(self):
-        try:
-            with open("progress.txt", "w") as f:
-                f.write(f"{self._wallet},{self._upgrades['speed']},{self._upgrades['life']}")
-        except OSError:
-            pass
+        if not self.persist:
+            return
+        _SAVES.save(PROGRESS_PATH, f"{self._wallet},{self._upgrades['speed']},{self._upgrades['life']}")
 
     def _add_particles(self, x, y, count, color):
-        for _ in range(count):
-            vx       = random.uniform(-200, 200)
-            vy       = random.uniform(-300, -100)
-            lifetime = random.uniform(0.3, 0.8)
-            self._particle_pool.spawn(x, y, vx, vy, color, lifetime)
+        if self.headless:
+            return
+        rng   = self._fx_rng
+        count = max(1, round(count * self.quality.level.particles))
+        self._particle_pool.emit(x, y, rng.uniform(-200, 200, count), rng.uniform(-300, -100, count), color,
+                                 rng.uniform(0.3, 0.8, count))
 
     def run(self):
-        while True:
-            dt = min(self.clock.tick(FPS) / 1000.0, 0.05)
-            self._handle_events()
-            self._update(dt)
-            self._draw(dt)
+        acc   = 0.0
+        frame = 0
+        prof  = self.profiler
+        last  = time.perf_counter()
+        try:
+            while True:
+                prof.begin_frame()
+                self.clock.tick(self.render_fps)
+                work_start = time.perf_counter()
+                frame_dt   = work_start - last
+                last       = work_start
+                acc       += min(frame_dt, _MAX_SIM_CATCHUP)
+                frame_dt   = min(frame_dt, _MAX_FRAME_TIME)
+                prof.lap(PHASE_IDLE)
+                self._handle_events()
+                prof.lap(PHASE_EVENTS)
+                while acc >= SIM_DT:
+                    self._update(SIM_DT)
+                    prof.lap(PHASE_COLLIDE)
+                    acc -= SIM_DT
+                self._draw(frame_dt, acc / SIM_DT)
+                if self.quality.sample(time.perf_counter() - work_start):
+                    self._on_quality_change()
+                prof.end_frame(self.level, self.quality.tier)
+                _SCRATCH.begin_frame()
+                frame += 1
+                if self._warmups or frame == 1:
+                    self._startup_step(frame)
+                if self.alloc_report and _SCRATCH.last_frame_allocations:
+                    print(f"frame {frame} ({self.state}): {_SCRATCH.last_frame_allocations} surfaces allocated, "
+                          f"{len(_SCRATCH)} held")
+        finally:
+            self._save_replay()
+            try:
+                _SAVES.flush()
+            finally:
+                if self.history is not None:
+                    self.history.flush()
+            if self.profile_path and len(self.profiler):
+                self.profiler.export(self.profile_path)
+
+    def _on_quality_change(self):
+        PowerUp.glow = self.quality.level.glow
+        self._rain_pool.set_active(self._rain_drops())
+
+    def simulate(self, controller=None, max_time=SIM_MAX_TIME, dt=SIM_DT, seed=None):
+        return self._simulate_ticks(controller or (lambda game: _IDLE_INPUT), round(max_time / dt), dt, seed)
+
+    def play_replay(self, replay):
+        self.selected_diff = replay.difficulty
+        self.selected_skin = replay.skin
+        self._upgrades     = dict(replay.upgrades)
+        return self._simulate_ticks(replay.controller(), len(replay), replay.dt, replay.seed)
+
+    def _simulate_ticks(self, controller, max_ticks, dt, seed):
+        self._controller = controller
+        self._reset_state(seed)
+        self.state = "playing"
+        ticks      = 0
+        try:
+            while self.state == "playing" and ticks < max_ticks:
+                self._update(dt)
+                ticks += 1
+        finally:
+            self._controller = None
+        return RunResult(self.score, self.level, self.run_coins, ticks * dt, self.lives)
+
+    def _poll_input(self):
+        if self._controller is not None:
+            inp = self._controller(self)
+        else:
+            keys  = pg.key.get_pressed()
+            inp   = SimInput(keys[pg.K_LEFT], keys[pg.K_RIGHT], self._boost_requested)
+            self._boost_requested = False
+        if self._replay is not None:
+            self._replay.record(inp)
+        return inp
+
+    def _save_replay(self):
+        replay, self._replay = self._replay, None
+        if replay is None or not len(replay):
+            return
+        replay.finish(self)
+        path = replay_path(self.record_path, replay.seed)
+        try:
+            replay.save(path)
+        except OSError as e:
+            print(f"could not save replay to {path}: {e}", file=sys.stderr)
+
+    def _try_boost(self):
+        if self.score >= 50 and self.player.boost_timer <= 0:
+            self.score -= 50
+            self.player.apply_boost()
+            self._set_fb("BOOSTING!", 0.8)
+            self._add_particles(self.player.x + Player.WIDTH // 2, self.player.y + Player.HEIGHT, 20, ORANGE)
+            self._play_sound("boost")
+        else:
+            self._set_fb("50 PTS NEEDED!", 0.7)
 
     def _handle_events(self):
         for ev in pg.event.get():
@@ -975,7 +2611,7 @@ class Game:
                 pg.quit()
                 sys.exit()
             if ev.type == pg.MOUSEBUTTONDOWN and ev.button == 1:
-                pos = ev.pos
+                pos = _DISPLAY.to_logical(ev.pos)
                 if self.state == "menu":
                     self._handle_menu_click(pos)
                 elif self.state == "garage":
@@ -997,14 +2633,7 @@ class Game:
                         self._save_high_score(); pg.quit(); sys.exit()
             if ev.type == pg.KEYDOWN:
                 if ev.key == pg.K_SPACE and self.state == "playing":
-                    if self.score >= 50 and self.player.boost_timer <= 0:
-                        self.score -= 50
-                        self.player.apply_boost()
-                        self._set_fb("BOOSTING!", 0.8)
-                        self._add_particles(self.player.x + Player.WIDTH // 2, self.player.y + Player.HEIGHT, 20, ORANGE)
-                        self._play_sound("boost")
-                    else:
-                        self._set_fb("50 PTS NEEDED!", 0.7)
+                    self._boost_requested = True
                 if ev.key == pg.K_p:
                     if self.state == "playing":
                         self.state = "paused"
@@ -1016,6 +2645,19 @@ class Game:
                             self.state = "playing"
                 if ev.key == pg.K_r and self.state == "gameover":
                     self._reset_state(); self.state = "playing"
+                if ev.key == pg.K_F3:
+                    self._show_profiler = not self._show_profiler
+                    self.profiler.enable(self._show_profiler or bool(self.profile_path))
+                if ev.key == pg.K_F11:
+                    _DISPLAY.toggle_fullscreen()
+                    self._on_display_change()
+            if ev.type == pg.VIDEORESIZE and _DISPLAY.resize(ev.size):
+                self._on_display_change()
+
+    def _on_display_change(self):
+        self.screen       = _DISPLAY.canvas
+        self._last_rects  = None
+        self._overlay_key = None
 
     def _handle_menu_click(self, pos):
         for d, r in self._diff_rects.items():
@@ -1077,22 +2719,35 @@ class Game:
         if self.weather_timer <= 0:
             if self.weather == WEATHER_CLEAR:
                 self.weather = WEATHER_RAIN
-                self.weather_timer = random.uniform(8.0, 15.0)
+                self.weather_timer = self.rng.uniform(8.0, 15.0)
+                self.rain_intensity = float(self._fx_rng.random())
             else:
                 self.weather = WEATHER_CLEAR
-                self.weather_timer = random.uniform(20.0, 40.0)
-            self._rain_pool.set_active(_RAIN_POOL_SIZE if self.weather == WEATHER_RAIN else 0)
+                self.weather_timer = self.rng.uniform(20.0, 40.0)
+                self.rain_intensity = 0.0
+            self._rain_pool.set_active(self._rain_drops())
+
+    def _rain_drops(self):
+        if self.weather != WEATHER_RAIN:
+            return 0
+        drops = _RAIN_LIGHT_DROPS + (_RAIN_POOL_SIZE - _RAIN_LIGHT_DROPS) * self.rain_intensity ** 2
+        return int(drops * self.quality.level.rain)
 
     def _update(self, dt):
         if self.state != "playing":
             return
 
+        self.run_time           += dt
         self.invincibility_timer = max(0.0, self.invincibility_timer - dt)
         self.level_flash_timer   = max(0.0, self.level_flash_timer - dt)
         self._update_weather(dt)
 
+        inp = self._poll_input()
+        if inp.boost:
+            self._try_boost()
+
         rain_penalty = 0.25 if self.weather == WEATHER_RAIN else 0.0
-        self.player.update(dt, pg.key.get_pressed(), rain_grip_penalty=rain_penalty)
+        self.player.update(dt, inp.left, inp.right, rain_grip_penalty=rain_penalty)
 
         freeze_factor          = 0.3 if self.player.has_powerup(POWERUP_TIMEFREEZE) else 1.0
         rain_speed_factor      = 0.9 if self.weather == WEATHER_RAIN else 1.0
@@ -1120,53 +2775,45 @@ class Game:
         self.powerup_timer += dt
         if self.powerup_timer >= 8.0:
             self.powerup_timer = 0.0
-            if random.random() < 0.55:
-                kind = random.choice([POWERUP_SHIELD, POWERUP_TIMEFREEZE])
-                self.powerups.append(PowerUp(LANE_CENTERS[random.randint(0, 3)], self.scroll_speed * 0.85, kind))
-
-        invincible   = self.invincibility_timer > 0
-        player_rect  = self.player.get_rect()
-        effective_dt = dt * freeze_factor
-
-        for car in self.obs_cars[:]:
-            if car.update(effective_dt):
-                self.obs_cars.remove(car)
-                self._on_obstacle_passed(2)
-                continue
-            if not invincible and not self.player.has_powerup(POWERUP_SHIELD) and car.get_rect().colliderect(player_rect):
+            if self.rng.random() < 0.55:
+                kind = self.rng.choice([POWERUP_SHIELD, POWERUP_TIMEFREEZE])
+                PowerUp.spawn(self.entities, LANE_CENTERS[self.rng.randint(0, 3)], self.scroll_speed * 0.85, kind)
+
+        self.profiler.lap(PHASE_SIM)
+
+        shielded     = self.player.has_powerup(POWERUP_SHIELD)
+        vulnerable   = self.invincibility_timer <= 0 and not shielded
+        store        = self.entities
+        broadphase   = self._broadphase
+        broadphase.aim(self.player.get_rect())
+        store.advance(dt * freeze_factor, broadphase)
+
+        passed, hits = store.sweep(GROUP_CARS, stop_on_hit=vulnerable)
+        for _ in range(passed):
+            self._on_obstacle_passed(2)
+        if hits and vulnerable:
+            self._on_hit()
+            return
+
+        passed, hits = store.sweep(GROUP_MISC, stop_on_hit=vulnerable)
+        for _ in range(passed):
+            self._on_obstacle_passed(1)
+        for i in hits:
+            if store.kind[i] == ENTITY_OIL:
+                if not shielded:
+                    self.player.apply_oil()
+                    self._set_fb("SLIPPING!", 0.8)
+            elif vulnerable:
                 self._on_hit()
                 return
 
-        for obj in self.obs_misc[:]:
-            if obj.update(effective_dt):
-                self.obs_misc.remove(obj)
-                self._on_obstacle_passed(1)
-                continue
-            if obj.get_rect().colliderect(player_rect):
-                if isinstance(obj, OilSlick):
-                    self.obs_misc.remove(obj)
-                    if not self.player.has_powerup(POWERUP_SHIELD):
-                        self.player.apply_oil()
-                        self._set_fb("SLIPPING!", 0.8)
-                elif not invincible and not self.player.has_powerup(POWERUP_SHIELD):
-                    self._on_hit()
-                    return
-
-        for coin in self.coins[:]:
-            if coin.update(effective_dt):
-                self.coins.remove(coin)
-                continue
-            if coin.get_rect().colliderect(player_rect):
-                self.coins.remove(coin)
-                self._on_coin(int(coin.x), int(coin.y))
+        _, hits = store.sweep(GROUP_COINS)
+        for i in hits:
+            self._on_coin(int(store.x[i]), int(store.y[i]))
 
-        for pu in self.powerups[:]:
-            if pu.update(effective_dt):
-                self.powerups.remove(pu)
-                continue
-            if pu.get_rect().colliderect(player_rect):
-                self.powerups.remove(pu)
-                self._on_powerup(pu.kind, int(pu.x), int(pu.y))
+        _, hits = store.sweep(GROUP_POWERUPS)
+        for i in hits:
+            self._on_powerup(PowerUp._kinds[store.sprite[i]], int(store.x[i]), int(store.y[i]))
 
         self.combo_timer += dt
         if self.combo_timer >= 2.5:
@@ -1187,19 +2834,20 @@ class Game:
             self._set_fb(f"LEVEL {self.level}!", 1.0)
             self._play_sound("levelup")
             for _ in range(5):
-                self.coins.append(Coin(LANE_CENTERS[random.randint(0, 3)], self.scroll_speed * 0.9))
+                Coin.spawn(self.entities, LANE_CENTERS[self.rng.randint(0, 3)], self.scroll_speed * 0.9, self.rng)
 
     def _spawn_coins(self):
-        existing_xs = {c.x for c in self.coins if c.y < 0}
+        store        = self.entities
+        existing_xs  = set(store.x[store.active & (store.group == GROUP_COINS) & (store.y < 0)].tolist())
         available    = [lc for lc in LANE_CENTERS if lc not in existing_xs]
         if not available:
             available = list(LANE_CENTERS)
-        random.shuffle(available)
-        count = random.randint(2, 4) if random.random() < 0.3 else 1
+        self.rng.shuffle(available)
+        count = self.rng.randint(2, 4) if self.rng.random() < 0.3 else 1
         count = min(count, len(available))
         chosen = available[:count]
         for lc in chosen:
-            self.coins.append(Coin(lc, self.scroll_speed * 0.95))
+            Coin.spawn(self.entities, lc, self.scroll_speed * 0.95, self.rng)
         self.coin_lane_history.extend(chosen)
         if len(self.coin_lane_history) > 12:
             self.coin_lane_history = self.coin_lane_history[-12:]
@@ -1210,18 +2858,18 @@ class Game:
         self.fb_timer = duration
 
     def _spawn_obstacle(self, diff):
-        spd             = random.uniform(*diff.obs_speed)
-        occ             = {c.lane for c in self.obs_cars}
+        spd             = self.rng.uniform(*diff.obs_speed)
+        occ             = self.entities.lanes(GROUP_CARS)
         available_lanes = [i for i in range(4) if i not in occ] or list(range(4))
-        lane            = random.choice(available_lanes)
+        lane            = self.rng.choice(available_lanes)
         lc              = LANE_CENTERS[lane]
-        roll            = random.random()
+        roll            = self.rng.random()
         if roll < 0.60:
-            self.obs_cars.append(ObstacleCar(lane, spd))
+            ObstacleCar.spawn(self.entities, lane, spd, self.rng)
         elif roll < 0.92:
-            self.obs_misc.append(Barrier(lc - Barrier.WIDTH // 2, spd))
+            Barrier.spawn(self.entities, lc - Barrier.WIDTH // 2, spd)
         else:
-            self.obs_misc.append(OilSlick(lc - OilSlick.WIDTH // 2, spd * 0.8))
+            OilSlick.spawn(self.entities, lc - OilSlick.WIDTH // 2, spd * 0.8)
 
     def _on_hit(self):
         self.lives -= 1
@@ -1252,7 +2900,7 @@ class Game:
         self.fb_timer = 0.7
         self._add_particles(x, y, 10, YELLOW)
         self._play_sound("coin")
-        if random.random() < 0.1 and self.player.boost_timer <= 0:
+        if self.rng.random() < 0.1 and self.player.boost_timer <= 0:
             self.player.apply_boost()
             self._set_fb("BOOST!", 0.8)
             self._play_sound("boost")
@@ -1274,179 +2922,255 @@ class Game:
         self._wallet      += self.run_coins
         self._save_progress()
         self._save_high_score()
+        self._record_run()
 
-    def _draw(self, dt):
-        self.screen.fill(BLACK)
+    def _record_run(self):
+        if not self.persist:
+            return
+        self.history.record(HistoryRow(time.time(), self.selected_diff, self.selected_skin, self.score, self.level,
+                                       self.run_coins, self.run_time, self._upgrades["speed"], self._upgrades["life"],
+                                       self.run_seed))
+
+    def _draw(self, dt, alpha=1.0):
+        if self.state in ("paused", "gameover") and self.dirty_rects:
+            pos = _DISPLAY.mouse_pos()
+            key = (self.state, self._confirm_pending, self.score, self._high_score,
+                   tuple(b.rect.collidepoint(pos) for b in self._overlay_buttons()))
+            if key == self._overlay_key:
+                return
+            self._overlay_key = key
+        else:
+            self._overlay_key = None
 
+        lap = self.profiler.lap
         if self.state == "menu":
             self._draw_menu()
-            pg.display.flip()
+            lap(PHASE_UI)
+            self._present()
             return
 
         if self.state == "garage":
             self._draw_garage()
-            pg.display.flip()
+            lap(PHASE_UI)
+            self._present()
             return
 
-        gameplay_surf = pg.Surface((WIDTH, HEIGHT))
-        gameplay_surf.fill(BLACK)
-        self.road.draw(gameplay_surf)
-        for obj in (*self.obs_cars, *self.obs_misc):
-            obj.draw(gameplay_surf)
-        for obj in (*self.coins, *self.powerups):
-            obj.draw(gameplay_surf)
-        self.player.draw(gameplay_surf, self.invincibility_timer > 0, pg.time.get_ticks())
-        self._particle_pool.update_and_draw(gameplay_surf, dt)
-
-        if self.weather == WEATHER_RAIN:
-            self._rain_pool.update_and_draw(gameplay_surf, dt, 1.0)
+        if self.state in ("paused", "gameover"):
+            key = (self.state, self._confirm_pending, self.score, self._high_score, self.level, self.run_coins)
+            self._overlay_layer.update(key, lambda surf: self._build_overlay_layer(surf, dt)).draw(self.screen)
+            for btn in self._visible_overlay_buttons():
+                btn.draw(self.screen, self.fonts[1])
+            lap(PHASE_UI)
+            self._present()
+            return
 
-        if self.speed_blur_alpha > 4:
-            alpha = int(self.speed_blur_alpha)
-            self._blur_surf.fill((0, 0, 0, 0))
-            self._blur_surf.blit(self._blur_lines, (0, 0))
-            self._blur_surf.set_alpha(alpha)
-            gameplay_surf.blit(self._blur_surf, (0, 0))
+        self._overlay_layer.invalidate()
+        self._present(self._draw_world(dt, lap, alpha))
 
-        self.screen.blit(gameplay_surf, (0, 0))
+    def _build_overlay_layer(self, surf, dt):
+        self._draw_world(dt, _skip_lap)
+        if self.state == "paused":
+            self._draw_pause()
+        else:
+            self._draw_gameover()
+        surf.blit(self.screen, (0, 0))
+
+    def _draw_world(self, dt, lap, alpha=1.0):
+        rects = self.road.draw(self.screen, alpha)
+        lap(PHASE_ROAD)
+        entity_rects = self.entities.draw(self.screen, alpha)
+        lap(PHASE_ENTITIES)
+        player_rect = self.player.draw(self.screen, self.invincibility_timer > 0, pg.time.get_ticks(),
+                                       self.quality.level.glow, alpha)
+        lap(PHASE_PLAYER)
+        particle_rect = self._particle_pool.update_and_draw(self.screen, dt)
+        if rects is not None:
+            rects += entity_rects + [player_rect, particle_rect]
+        lap(PHASE_PARTICLES)
 
-        self.hud.draw(
+        if self.weather == WEATHER_RAIN:
+            self._rain_pool.update_and_draw(self.screen, dt, 1.0)
+            rects = None
+            lap(PHASE_RAIN)
+
+        if self.speed_blur_alpha > 4 and self.quality.level.blur:
+            blur, lines = self._blur_layers()
+            blur.fill((0, 0, 0, 0))
+            blur.blit(lines, (0, 0))
+            blur.set_alpha(int(self.speed_blur_alpha))
+            self.screen.blit(blur, (0, 0))
+            if rects is not None:
+                rects += self._blur_rects
+            lap(PHASE_BLUR)
+
+        hud_rect = self.hud.draw(
             self.screen, self.score, self.level, self.speed_pct,
             self.selected_diff, self.multiplier, self.lives, self.base_lives,
             self.player.boost_timer, self.player, self.weather,
         )
-        self.btn_pause.draw(self.screen, self.fonts[2])
-        self._draw_feedback()
+        pause_rect = self.btn_pause.draw(self.screen, self.fonts[2])
+        fb_rect    = self._draw_feedback()
+        if rects is not None:
+            rects += [hud_rect, pause_rect, fb_rect]
 
         if self.state == "playing" and self.score >= 50 and self.player.boost_timer <= 0:
-            hint = self.fonts[2].render("SPACE = BOOST (50 pts)", True, (255, 200, 0))
-            hint.set_alpha(128 + int(64 * abs(math.sin(pg.time.get_ticks() / 200))))
-            self.screen.blit(hint, (WIDTH - 180, HEIGHT - 30))
+            alpha     = 128 + int(64 * abs(math.sin(pg.time.get_ticks() / 200)))
+            hint_rect = _TEXT.draw(self.screen, self.fonts[2], "SPACE = BOOST (50 pts)", (255, 200, 0),
+                                   (WIDTH - 180, HEIGHT - 30), alpha)
+            if rects is not None:
+                rects.append(hint_rect)
+
+        lap(PHASE_HUD)
 
         if self.level_flash_timer > 0:
             self._draw_level_flash()
-        if self.state == "paused":
-            self._draw_pause()
-        elif self.state == "gameover":
-            self._draw_gameover()
+            rects = None
+            lap(PHASE_UI)
+        return rects
+
+    def _present(self, rects=None):
+        if self._show_profiler:
+            if self._profile_font is None:
+                self._profile_font = pg.font.Font(None, 18)
+            self.profiler.draw(self.screen, self._profile_font)
+            self.profiler.lap(PHASE_PROFILER)
+            rects = None
+        self._present_screen(rects)
+        self.profiler.lap(PHASE_PRESENT)
+
+    def _present_screen(self, rects):
+        if not _DISPLAY.direct:
+            _DISPLAY.present()
+            self._last_rects = None
+            return
+        if not self.dirty_rects or rects is None or self._last_rects is None:
+            pg.display.flip()
+            self._last_rects = None if rects is None else [r for r in rects if r]
+            return
+        rects            = [r for r in rects if r]
+        self._last_rects, rects = rects, rects + self._last_rects
+        pg.display.update(rects)
 
-        pg.display.flip()
+    def _overlay_buttons(self):
+        return (self.btn_restart, self.btn_menu, self.btn_quit, self.btn_pause_yes, self.btn_pause_no)
+
+    def _visible_overlay_buttons(self):
+        if self.state == "gameover":
+            return (self.btn_restart, self.btn_menu, self.btn_quit)
+        if self._confirm_pending:
+            return (self.btn_pause_yes, self.btn_pause_no)
+        return (self.btn_restart, self.btn_menu)
 
     def _draw_level_flash(self):
         alpha = int(clamp(self.level_flash_timer / 1.0 * 200, 0, 200))
-        s     = pg.Surface((WIDTH, HEIGHT), pg.SRCALPHA)
-        s.fill((255, 255, 100, min(alpha // 4, 40)))
+        s     = _SCRATCH.get("level_flash", self.screen.get_size(), (255, 255, 100, min(alpha // 4, 40)))
         self.screen.blit(s, (0, 0))
-        t = self.fonts[0].render(f"LEVEL {self.level}!", True, YELLOW)
-        t.set_alpha(alpha)
         y_offset = int(20 * math.sin(pg.time.get_ticks() / 100))
-        self.screen.blit(t, t.get_rect(center=(WIDTH // 2, HEIGHT // 2 - 40 + y_offset)))
+        _TEXT.draw_centered(self.screen, self.fonts[0], f"LEVEL {self.level}!", YELLOW,
+                            (WIDTH // 2, HEIGHT // 2 - 40 + y_offset), alpha)
+
+    def _draw_backdrop(self):
+        if not self.quality.level.gradient:
+            self.screen.fill(_MENU_BG_FLAT)
+            return
+        scale  = _DISPLAY.scale
+        offset = round(pg.time.get_ticks() / 1000 * 30 % _MENU_BG_PERIOD * scale)
+        self.screen.blit(_menu_backdrop(scale), (0, 0), ((0, offset), self.screen.get_size()))
 
     def _draw_feedback(self):
         if self.fb_timer <= 0 or not self.fb_text:
             return
         alpha  = int(255 * (self.fb_timer / 0.8))
         y      = self.fb_pos[1] - int((0.8 - self.fb_timer) * 80)
-        surf   = self.fonts[1].render(self.fb_text, True, YELLOW)
-        surf.set_alpha(clamp(alpha, 0, 255))
-        shadow = self.fonts[1].render(self.fb_text, True, BLACK)
-        shadow.set_alpha(alpha // 2)
-        self.screen.blit(shadow, (self.fb_pos[0] - surf.get_width() // 2 + 2, y + 2))
-        self.screen.blit(surf, surf.get_rect(center=(self.fb_pos[0], y)))
+        font   = self.fonts[1]
+        w, h   = _TEXT.size(font, self.fb_text)
+        shadow_rect = _TEXT.draw(self.screen, font, self.fb_text, BLACK, (self.fb_pos[0] - w // 2 + 2, y + 2), alpha // 2)
+        return _TEXT.draw(self.screen, font, self.fb_text, YELLOW, (self.fb_pos[0] - w // 2, y - h // 2),
+                          clamp(alpha, 0, 255)).union(shadow_rect)
 
     def _draw_menu(self):
-        f_main, f_small, f_tiny = self.fonts
-        elapsed = pg.time.get_ticks() / 1000
-        for y in range(HEIGHT):
-            shade = clamp(10 + int(25 * math.sin(y / 30 + elapsed)), 0, 255)
-            pg.draw.line(self.screen, (shade, shade, min(shade + 10, 255)), (0, y), (WIDTH, y))
+        f_small, f_tiny = self.fonts[1], self.fonts[2]
+        self._draw_backdrop()
+        key = (self.selected_diff, self.selected_skin, self._upgrades["speed"], self._high_score, self._wallet)
+        self._menu_layer.update(key, self._build_menu_layer).draw(self.screen)
+
+        mouse = _DISPLAY.mouse_pos()
+        for rect, direction in [(self._arrow_left_rect, "left"), (self._arrow_right_rect, "right")]:
+            col = GREEN if rect.collidepoint(mouse) else (70, 70, 75)
+            if rect.collidepoint(mouse):
+                pg.draw.rect(self.screen, (0, 200, 0, 80), _DISPLAY.rect(rect.inflate(10, 10)),
+                             border_radius=_DISPLAY.length(8))
+            pg.draw.rect(self.screen, col, _DISPLAY.rect(rect), border_radius=_DISPLAY.length(6))
+            pg.draw.rect(self.screen, WHITE, _DISPLAY.rect(rect), 1, border_radius=_DISPLAY.length(6))
+            draw_arrow(self.screen, *_DISPLAY.point(rect.center), _DISPLAY.length(18), WHITE, direction)
 
+        self.btn_play.draw(self.screen, f_small)
+        self.btn_garage.draw(self.screen, f_tiny)
+
+        hint    = _TEXT.render(f_tiny, "   Move  |  SPACE to boost  |  P - Pause  |  R - Restart", GRAY)
+        text_x  = WIDTH // 2 - hint.get_width() // 2
+        MARGIN  = 20
+        al_x    = text_x - 22
+        ar_x    = text_x - 4
+        if al_x < MARGIN:
+            shift  = MARGIN - al_x
+            al_x  += shift
+            ar_x  += shift
+            text_x += shift
+        _DISPLAY.blit(self.screen, hint, (text_x, 555))
+        draw_arrow(self.screen, *_DISPLAY.point((al_x, 560)), _DISPLAY.length(14), GRAY, "left")
+        draw_arrow(self.screen, *_DISPLAY.point((ar_x, 560)), _DISPLAY.length(14), GRAY, "right")
+
+    def _build_menu_layer(self, surf):
+        f_main, f_small, f_tiny = self.fonts
         title = f_main.render("ATARI RACER", True, YELLOW)
         tx    = WIDTH // 2 - title.get_width() // 2
         for offset in range(3):
             glow = f_main.render("ATARI RACER", True, (100, 70 + offset * 20, 0))
-            self.screen.blit(glow, (tx - offset, 38 - offset))
-        self.screen.blit(title, (tx, 35))
+            surf.blit(glow, (tx - offset, 38 - offset))
+        surf.blit(title, (tx, 35))
         sub = f_tiny.render("EXTREME EDITION", True, ORANGE)
-        self.screen.blit(sub, (WIDTH // 2 - sub.get_width() // 2, 85))
+        surf.blit(sub, (WIDTH // 2 - sub.get_width() // 2, 85))
 
-        bg = pg.Surface((460, 480), pg.SRCALPHA)
-        bg.fill((0, 0, 0, 190))
+        bg = _SCRATCH.get("menu_panel", (460, 480), (0, 0, 0, 190))
         pg.draw.rect(bg, (255, 255, 255, 40), (0, 0, 460, 480), 2, border_radius=15)
-        self.screen.blit(bg, (WIDTH // 2 - 230, 115))
+        surf.blit(bg, (WIDTH // 2 - 230, 115))
 
         lbl = f_small.render("DIFFICULTY", True, WHITE)
-        self.screen.blit(lbl, (WIDTH // 2 - lbl.get_width() // 2, 122))
+        surf.blit(lbl, (WIDTH // 2 - lbl.get_width() // 2, 122))
         for d, r in self._diff_rects.items():
             sel = d == self.selected_diff
             col = GREEN if sel else (70, 70, 75)
             if sel:
-                pg.draw.rect(self.screen, (0, 200, 0, 80), r.inflate(10, 10), border_radius=8)
-            pg.draw.rect(self.screen, col, r, border_radius=7)
-            pg.draw.rect(self.screen, WHITE, r, 2 if sel else 1, border_radius=7)
+                pg.draw.rect(surf, (0, 200, 0), r.inflate(10, 10), border_radius=8)
+            pg.draw.rect(surf, col, r, border_radius=7)
+            pg.draw.rect(surf, WHITE, r, 2 if sel else 1, border_radius=7)
             t = f_small.render(d, True, WHITE)
-            self.screen.blit(t, t.get_rect(center=r.center))
+            surf.blit(t, t.get_rect(center=r.center))
 
         lbl2 = f_small.render("CAR SKIN", True, WHITE)
-        self.screen.blit(lbl2, (WIDTH // 2 - lbl2.get_width() // 2, 310))
+        surf.blit(lbl2, (WIDTH // 2 - lbl2.get_width() // 2, 310))
         skin     = CAR_SKINS[self.selected_skin]
         px, py   = WIDTH // 2 - 24, 345
-        pbg      = pg.Surface((100, 110), pg.SRCALPHA)
-        pbg.fill((25, 25, 35, 220))
+        pbg      = _SCRATCH.get("skin_panel", (100, 110), (25, 25, 35, 220))
         pg.draw.rect(pbg, (255, 255, 255, 40), (0, 0, 100, 110), 1, border_radius=8)
-        self.screen.blit(pbg, (px - 26, py - 5))
-        draw_car(self.screen, px, py, 48, 88, skin.color, CYAN, skin.type, player=True)
-
-        mouse = pg.mouse.get_pos()
-        for rect, direction in [(self._arrow_left_rect, "left"), (self._arrow_right_rect, "right")]:
-            col = GREEN if rect.collidepoint(mouse) else (70, 70, 75)
-            if rect.collidepoint(mouse):
-                pg.draw.rect(self.screen, (0, 200, 0, 80), rect.inflate(10, 10), border_radius=8)
-            pg.draw.rect(self.screen, col, rect, border_radius=6)
-            pg.draw.rect(self.screen, WHITE, rect, 1, border_radius=6)
-            draw_arrow(self.screen, rect.centerx, rect.centery, 18, WHITE, direction)
+        surf.blit(pbg, (px - 26, py - 5))
+        draw_car(surf, px, py, 48, 88, skin.color, CYAN, skin.type, player=True)
 
         bonus_val  = skin.speed_bonus + self._upgrades["speed"] * UPGRADE_SPEED_STEP
         bonus_text = f_tiny.render(
             f"{skin.name} - {'+' if bonus_val > 1 else ''}{int((bonus_val - 1) * 100)}% SPEED",
             True, GREEN if bonus_val >= 1 else ORANGE,
         )
-        self.screen.blit(bonus_text, (WIDTH // 2 - bonus_text.get_width() // 2, 445))
+        surf.blit(bonus_text, (WIDTH // 2 - bonus_text.get_width() // 2, 445))
         hs_text = f"HIGH SCORE: {self._high_score}    COINS: {self._wallet}"
-        self.screen.blit(f_tiny.render(hs_text, True, YELLOW), (WIDTH // 2 - f_tiny.size(hs_text)[0] // 2, 465))
-        self.btn_play.draw(self.screen, f_small)
-        self.btn_garage.draw(self.screen, f_tiny)
-
-        hint    = f_tiny.render("   Move  |  SPACE to boost  |  P - Pause  |  R - Restart", True, GRAY)
-        text_x  = WIDTH // 2 - hint.get_width() // 2
-        MARGIN  = 20
-        al_x    = text_x - 22
-        ar_x    = text_x - 4
-        if al_x < MARGIN:
-            shift  = MARGIN - al_x
-            al_x  += shift
-            ar_x  += shift
-            text_x += shift
-        self.screen.blit(hint, (text_x, 555))
-        draw_arrow(self.screen, al_x, 560, 14, GRAY, "left")
-        draw_arrow(self.screen, ar_x, 560, 14, GRAY, "right")
+        surf.blit(f_tiny.render(hs_text, True, YELLOW), (WIDTH // 2 - f_tiny.size(hs_text)[0] // 2, 465))
+        return [pg.Rect(WIDTH // 2 - 230, 30, 460, 565)]
 
     def _draw_garage(self):
-        f_main, f_small, f_tiny = self.fonts
-        elapsed = pg.time.get_ticks() / 1000
-        for y in range(HEIGHT):
-            shade = clamp(10 + int(25 * math.sin(y / 30 + elapsed)), 0, 255)
-            pg.draw.line(self.screen, (shade, shade, min(shade + 10, 255)), (0, y), (WIDTH, y))
-
-        title = f_main.render("GARAGE", True, YELLOW)
-        self.screen.blit(title, (WIDTH // 2 - title.get_width() // 2, 35))
-        coin_text = f_small.render(f"COINS: {self._wallet}", True, YELLOW)
-        self.screen.blit(coin_text, (WIDTH // 2 - coin_text.get_width() // 2, 95))
-
-        bg = pg.Surface((460, 380), pg.SRCALPHA)
-        bg.fill((0, 0, 0, 190))
-        pg.draw.rect(bg, (255, 255, 255, 40), (0, 0, 460, 380), 2, border_radius=15)
-        self.screen.blit(bg, (WIDTH // 2 - 230, 140))
+        f_small, f_tiny = self.fonts[1], self.fonts[2]
+        self._draw_backdrop()
+        self._garage_layer.update(self._wallet, self._build_garage_layer).draw(self.screen)
 
         speed_level = self._upgrades["speed"]
         if speed_level >= UPGRADE_SPEED_MAX_LEVEL:
@@ -1468,24 +3192,34 @@ class Game:
             self.btn_upgrade_life.enabled = self._wallet >= cost
         self.btn_upgrade_life.draw(self.screen, f_tiny)
 
+        self.btn_garage_back.draw(self.screen, f_small)
+
+    def _build_garage_layer(self, surf):
+        f_main, f_small, f_tiny = self.fonts
+        title = f_main.render("GARAGE", True, YELLOW)
+        surf.blit(title, (WIDTH // 2 - title.get_width() // 2, 35))
+        coin_text = f_small.render(f"COINS: {self._wallet}", True, YELLOW)
+        surf.blit(coin_text, (WIDTH // 2 - coin_text.get_width() // 2, 95))
+
+        bg = _SCRATCH.get("garage_panel", (460, 380), (0, 0, 0, 190))
+        pg.draw.rect(bg, (255, 255, 255, 40), (0, 0, 460, 380), 2, border_radius=15)
+        surf.blit(bg, (WIDTH // 2 - 230, 140))
+
         info1 = f_tiny.render(f"Permanently +{int(UPGRADE_SPEED_STEP * 100)}% top speed per level", True, GRAY)
-        self.screen.blit(info1, (WIDTH // 2 - info1.get_width() // 2, 270))
+        surf.blit(info1, (WIDTH // 2 - info1.get_width() // 2, 270))
         info2 = f_tiny.render("Permanently +1 starting life per level", True, GRAY)
-        self.screen.blit(info2, (WIDTH // 2 - info2.get_width() // 2, 340))
-
-        self.btn_garage_back.draw(self.screen, f_small)
+        surf.blit(info2, (WIDTH // 2 - info2.get_width() // 2, 340))
+        return [pg.Rect(WIDTH // 2 - 230, 30, 460, 490)]
 
     def _draw_overlay(self, title_text, title_color, box_h, box_border_color):
-        overlay = pg.Surface((WIDTH, HEIGHT), pg.SRCALPHA)
-        overlay.fill((0, 0, 0, 210))
+        overlay = _SCRATCH.get("overlay", self.screen.get_size(), (0, 0, 0, 210))
         self.screen.blit(overlay, (0, 0))
         bx, by  = WIDTH // 2 - 200, HEIGHT // 2 - box_h // 2
-        box     = pg.Surface((400, box_h), pg.SRCALPHA)
-        box.fill((20, 20, 30, 250))
+        box     = _SCRATCH.get("overlay_box", (400, box_h), (20, 20, 30, 250))
         pg.draw.rect(box, box_border_color, (0, 0, 400, box_h), 3, border_radius=15)
-        self.screen.blit(box, (bx, by))
-        t = self.fonts[0].render(title_text, True, title_color)
-        self.screen.blit(t, (WIDTH // 2 - t.get_width() // 2, by + 18))
+        _DISPLAY.blit_rescaled(self.screen, box, (bx, by), "overlay_box_view")
+        t = _TEXT.render(self.fonts[0], title_text, title_color)
+        _DISPLAY.blit(self.screen, t, (WIDTH // 2 - t.get_width() // 2, by + 18))
         return by
 
     def _draw_overlay_stats(self, by):
@@ -1495,27 +3229,22 @@ class Game:
             (f"SCORE: {self.score}", WHITE, 62),
             (f"LEVEL: {self.level}", CYAN,  90),
         ]:
-            t = f_small.render(text, True, color)
-            self.screen.blit(t, (cx - t.get_width() // 2, by + dy))
+            _TEXT.draw(self.screen, f_small, text, color, (cx - _TEXT.size(f_small, text)[0] // 2, by + dy))
 
     def _draw_pause(self):
-        f_small, f_tiny = self.fonts[1], self.fonts[2]
+        f_tiny = self.fonts[2]
         if not self._confirm_pending:
             by = self._draw_overlay("PAUSED", YELLOW, 180, (255, 255, 255, 60))
             self._layout_overlay_buttons(by)
             self.btn_restart.text = "RESTART"
             self.btn_menu.text    = "MAIN MENU"
-            self.btn_restart.draw(self.screen, f_small)
-            self.btn_menu.draw(self.screen, f_small)
-            hint = f_tiny.render("P to resume", True, GRAY)
-            self.screen.blit(hint, (WIDTH // 2 - hint.get_width() // 2, by + 120))
+            hint = _TEXT.render(f_tiny, "P to resume", GRAY)
+            _DISPLAY.blit(self.screen, hint, (WIDTH // 2 - hint.get_width() // 2, by + 120))
         else:
             by = self._draw_overlay("ARE YOU SURE?", YELLOW, 150, (255, 255, 255, 60))
             cx = WIDTH // 2
             self.btn_pause_yes.rect = pg.Rect(cx - 95, by + 90, 85, 42)
             self.btn_pause_no.rect  = pg.Rect(cx + 10, by + 90, 85, 42)
-            self.btn_pause_yes.draw(self.screen, f_small)
-            self.btn_pause_no.draw(self.screen, f_small)
 
     def _draw_gameover(self):
         f_small, f_tiny = self.fonts[1], self.fonts[2]
@@ -1523,21 +3252,122 @@ class Game:
         self._draw_overlay_stats(by)
         cx = WIDTH // 2
         if self.score >= self._high_score:
-            hs_surf = f_small.render("NEW HIGH SCORE!", True, YELLOW)
+            hs_font, hs_text, hs_col = f_small, "NEW HIGH SCORE!", YELLOW
         else:
-            hs_surf = f_tiny.render(f"BEST: {self._high_score}", True, GRAY)
-        self.screen.blit(hs_surf, (cx - hs_surf.get_width() // 2, by + 118))
-        coins_surf = f_tiny.render(f"COINS EARNED: {self.run_coins}", True, YELLOW)
-        self.screen.blit(coins_surf, (cx - coins_surf.get_width() // 2, by + 140))
+            hs_font, hs_text, hs_col = f_tiny, f"BEST: {self._high_score}", GRAY
+        _TEXT.draw(self.screen, hs_font, hs_text, hs_col, (cx - _TEXT.size(hs_font, hs_text)[0] // 2, by + 118))
+        coins_text = f"COINS EARNED: {self.run_coins}"
+        _TEXT.draw(self.screen, f_tiny, coins_text, YELLOW, (cx - _TEXT.size(f_tiny, coins_text)[0] // 2, by + 140))
         self._layout_overlay_buttons(by, include_quit=True)
         self.btn_restart.text = "RESTART"
         self.btn_menu.text    = "MAIN MENU"
-        self.btn_restart.draw(self.screen, f_small)
-        self.btn_menu.draw(self.screen, f_small)
-        self.btn_quit.draw(self.screen, f_small)
-        hint = f_tiny.render("R restart", True, GRAY)
-        self.screen.blit(hint, (cx - hint.get_width() // 2, by + 308))
-
+        hint = _TEXT.render(f_tiny, "R restart", GRAY)
+        _DISPLAY.blit(self.screen, hint, (cx - hint.get_width() // 2, by + 308))
+
+
+def print_history(history, n=5, out=sys.stdout):
+    out.write(f"{history.count()} runs recorded in {history.path}\n")
+    for diff in DIFFICULTY:
+        avg = history.rolling_average(20, diff)
+        out.write(f"{diff}: best {history.best(diff)}, last 20 average {avg:.1f}\n" if avg is not None else
+                  f"{diff}: no runs\n")
+        for r in history.top(n, diff):
+            out.write(f"  {r.score:>7}  level {r.level:>2}  coins {r.coins:>4}  {r.duration:6.1f}s  "
+                      f"{CAR_SKINS[r.skin % len(CAR_SKINS)].name:<14} {time.strftime('%Y-%m-%d %H:%M', time.localtime(r.played_at))}\n")
+
+
+def _parse_size(text):
+    w, _, h = text.lower().partition("x")
+    try:
+        size = (int(w), int(h))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WxH, got {text!r}")
+    if min(size) <= 0:
+        raise argparse.ArgumentTypeError(f"expected a positive size, got {text!r}")
+    return size
+
+
+def _parse_internal_res(text):
+    return INTERNAL_RES_WINDOW if text.lower() == INTERNAL_RES_WINDOW else _parse_size(text)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HIGH SPEED RACER - Extreme Edition")
+    parser.add_argument("--headless", type=int, metavar="RUNS",
+                        help="simulate RUNS races with the autopilot, without a window or audio")
+    parser.add_argument("--difficulty", choices=list(DIFFICULTY), default="Medium")
+    parser.add_argument("--skin", type=int, default=0, help="index into CAR_SKINS")
+    parser.add_argument("--max-time", type=float, default=SIM_MAX_TIME,
+                        help="simulated seconds before a headless race is cut off")
+    parser.add_argument("--seed", type=int, help="seed the per-run RNGs so races are reproducible")
+    parser.add_argument("--record", metavar="PATH", help="record every race's input, each to its own PATH-<seed>-<n> file")
+    parser.add_argument("--replay", metavar="PATH", help="play a recorded race back headless and verify it")
+    parser.add_argument("--dirty-rects", action="store_true",
+                        help="present only the screen regions that changed instead of flipping every frame")
+    parser.add_argument("--alloc-report", action="store_true",
+                        help="print every frame that allocated a surface: scratch, text or cached sprite")
+    parser.add_argument("--profile", action="store_true",
+                        help="time every frame phase from the start and show the overlay (F3 toggles it)")
+    parser.add_argument("--profile-out", metavar="PATH",
+                        help="on exit, write the profiled frames to PATH as CSV, or as a Chrome trace if it ends in .json")
+    parser.add_argument("--window", type=_parse_size, default=(WIDTH, HEIGHT), metavar="WxH",
+                        help="initial window size; the internal resolution is scaled to fit it")
+    parser.add_argument("--internal-res", type=_parse_internal_res, default=(WIDTH, HEIGHT), metavar="WxH",
+                        help=f"resolution the game draws at before scaling, fitted to the {WIDTH}x{HEIGHT} field; "
+                             f"'{INTERNAL_RES_WINDOW}' follows the window")
+    parser.add_argument("--fullscreen", action="store_true", help="start fullscreen at desktop resolution (F11 toggles)")
+    parser.add_argument("--smooth-scale", action="store_true",
+                        help="filter the scaled image instead of using nearest-neighbour scaling")
+    parser.add_argument("--render-fps", type=int, default=FPS, metavar="N",
+                        help=f"frames drawn per second, 0 for uncapped; the simulation always ticks at {FPS} Hz")
+    parser.add_argument("--quality", choices=("auto",) + QUALITY_NAMES, default="auto",
+                        help="effects tier; auto steps down when frames miss the FPS target and back up with headroom")
+    parser.add_argument("--history", action="store_true",
+                        help=f"print best scores, recent averages and top runs per difficulty from {RUN_HISTORY_PATH}")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="print the time spent in each startup step up to the first presented frame")
+    parser.add_argument("--startup-budget", type=float, default=STARTUP_BUDGET, metavar="SECONDS",
+                        help="warn with the startup report when the first frame takes longer than this")
+    args = parser.parse_args(argv)
+    _STARTUP.mark("args")
+
+    if args.history:
+        print_history(RunHistory())
+        return
+
+    if args.replay:
+        replay = Replay.load(args.replay)
+        game   = Game(headless=True)
+        start  = time.perf_counter()
+        r      = game.play_replay(replay)
+        wall   = time.perf_counter() - start
+        print(f"replay: score={r.score} level={r.level} coins={r.coins} time={r.time:.1f}s "
+              f"({r.time / max(wall, 1e-9):.0f}x realtime)")
+        if replay.result is not None:
+            actual = (game.score, game.level, game.run_coins, game.player.x)
+            print("result matches recording" if actual == replay.result else
+                  f"MISMATCH: recorded {replay.result}, replayed {actual}")
+        return
+
+    if args.headless:
+        game = Game(headless=True, seed=args.seed)
+        game.selected_diff = args.difficulty
+        game.selected_skin = args.skin % len(CAR_SKINS)
+        start = time.perf_counter()
+        for i in range(args.headless):
+            r = game.simulate(autopilot, max_time=args.max_time)
+            print(f"run {i + 1}: score={r.score} level={r.level} coins={r.coins} time={r.time:.1f}s lives={r.lives}")
+        print(f"{args.headless} runs in {time.perf_counter() - start:.2f}s")
+        return
+
+    Game(seed=args.seed, record_path=args.record, dirty_rects=args.dirty_rects,
+         alloc_report=args.alloc_report, profile=args.profile, profile_path=args.profile_out,
+         startup_report=args.startup_report, startup_budget=args.startup_budget,
+         window_size=args.window, fullscreen=args.fullscreen, smooth_scale=args.smooth_scale,
+         quality=args.quality, render_fps=max(0, args.render_fps), internal_res=args.internal_res).run()
+
+
+_STARTUP.mark("import")
 
 if __name__ == "__main__":
-    Game().run()
+    main()
@@ -0,0 +1,473 @@
+import time
+import argparse
+
+import numpy as np
+
+from atari import (
+    DIFFICULTY, LANE_CENTERS, ROAD_LEFT, ROAD_RIGHT, HEIGHT, SIM_DT, COIN_BASE_VALUE,
+    POWERUP_META, POWERUP_SHIELD, POWERUP_TIMEFREEZE,
+    Player, Barrier, OilSlick, Coin, PowerUp, _COMBO_THRESHOLDS, _COMBO_MULTIPLIERS,
+)
+
+ACTION_LEFT  = 1
+ACTION_RIGHT = 2
+ACTION_BOOST = 4
+
+KIND_CAR     = 0
+KIND_BARRIER = 1
+KIND_OIL     = 2
+
+PU_SHIELD     = 0
+PU_TIMEFREEZE = 1
+
+OBS_DIM = 11 + 4 * len(LANE_CENTERS)
+
+_N_LANES     = len(LANE_CENTERS)
+_LANES       = np.array(LANE_CENTERS, dtype=np.float64)
+_CAR_HEIGHTS = np.array([82, 88, 94], dtype=np.float64)
+_THRESHOLDS  = np.array(_COMBO_THRESHOLDS)
+_MULT_TABLE  = np.array(_COMBO_MULTIPLIERS + (1.0,))
+
+_RECT_LEFT   = np.array([-20.0, -Barrier.WIDTH / 2, -OilSlick.WIDTH / 2], np.float32)
+_RECT_W      = np.array([40.0, Barrier.WIDTH, OilSlick.WIDTH], np.float32)
+_RECT_TOP    = np.array([4.0, 0.0, 0.0], np.float32)
+_PU_DURATION = np.array([POWERUP_META[POWERUP_SHIELD][2], POWERUP_META[POWERUP_TIMEFREEZE][2]])
+
+_P_TOP    = np.float32(HEIGHT - Player.HEIGHT - 30 + 6)
+_P_BOTTOM = np.float32(_P_TOP + Player.HEIGHT - 12)
+_P_W      = Player.WIDTH - 12
+_X_MIN    = ROAD_LEFT + 2
+_X_MAX    = ROAD_RIGHT - Player.WIDTH - 2
+_PARKED   = np.float32(-1e4)
+_FAR      = np.float32(4.0)
+
+
+def _first_free(active):
+    free = ~active
+    slot = free.argmax(0)
+    return slot, free[slot, np.arange(active.shape[1])]
+
+
+def _lane_mask(active, lanes):
+    slots, cols = np.nonzero(active)
+    mask = np.zeros((active.shape[1], _N_LANES), bool)
+    mask[cols, lanes[slots, cols]] = True
+    return mask
+
+
+def _lane_minima(obs, col, key, pos, head, below):
+    near = np.flatnonzero((pos < _P_BOTTOM + head) & (pos > _PARKED))
+    if isinstance(below, np.ndarray):
+        below = below.reshape(-1)[near]
+    gap = (_P_TOP - pos.reshape(-1)[near] - below) / HEIGHT
+    np.minimum.at(obs.reshape(-1), near % obs.shape[0] * OBS_DIM + col + key.reshape(-1)[near], gap)
+
+
+class BatchRaceEnv:
+    def __init__(self, n, difficulty="Medium", life_level=0, max_obstacles=16, max_coins=32, max_powerups=4,
+                 seed=None, auto_reset=True):
+        self.n          = n
+        self.diff       = DIFFICULTY[difficulty] if isinstance(difficulty, str) else difficulty
+        self.base_lives = 3 + life_level
+        self.auto_reset = auto_reset
+        self.rng        = np.random.default_rng(seed)
+
+        self.x              = np.zeros(n)
+        self.vel_x          = np.zeros(n)
+        self.slide_vel      = np.zeros(n)
+        self.slide_timer    = np.zeros(n)
+        self.hazard_lockout = np.zeros(n)
+        self.boost_timer    = np.zeros(n)
+        self.invincible     = np.zeros(n)
+        self.obs_timer      = np.zeros(n)
+        self.obs_interval   = np.zeros(n)
+        self.coin_timer     = np.zeros(n)
+        self.powerup_timer  = np.zeros(n)
+        self.shield_timer   = np.zeros(n)
+        self.freeze_timer   = np.zeros(n)
+        self.weather_timer  = np.zeros(n)
+        self.raining        = np.zeros(n, bool)
+        self.combo_timer    = np.zeros(n)
+        self.scroll_speed   = np.zeros(n)
+        self.time           = np.zeros(n)
+        self.multiplier     = np.ones(n)
+        self.score          = np.zeros(n, np.int64)
+        self.run_coins      = np.zeros(n, np.int64)
+        self.level          = np.ones(n, np.int64)
+        self.lives          = np.zeros(n, np.int64)
+        self.combo          = np.zeros(n, np.int64)
+        self.done           = np.zeros(n, bool)
+        self.dropped        = np.zeros(n, np.int64)
+
+        self.ob_active = np.zeros((max_obstacles, n), bool)
+        self.ob_kind   = np.zeros((max_obstacles, n), np.int8)
+        self.ob_lane   = np.zeros((max_obstacles, n), np.int8)
+        self.ob_top    = np.full((max_obstacles, n), _PARKED)
+        self.ob_exit   = np.zeros((max_obstacles, n), np.float32)
+        self.ob_speed  = np.zeros((max_obstacles, n), np.float32)
+        self.ob_left   = np.zeros((max_obstacles, n), np.float32)
+        self.ob_right  = np.zeros((max_obstacles, n), np.float32)
+        self.ob_h      = np.zeros((max_obstacles, n), np.float32)
+
+        self.co_active = np.zeros((max_coins, n), bool)
+        self.co_lane   = np.zeros((max_coins, n), np.int8)
+        self.co_y      = np.full((max_coins, n), _PARKED)
+        self.co_speed  = np.zeros((max_coins, n), np.float32)
+
+        self.pu_active = np.zeros((max_powerups, n), bool)
+        self.pu_kind   = np.zeros((max_powerups, n), np.int8)
+        self.pu_lane   = np.zeros((max_powerups, n), np.int8)
+        self.pu_y      = np.full((max_powerups, n), _PARKED)
+        self.pu_speed  = np.zeros((max_powerups, n), np.float32)
+
+        self.reset()
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        self._reset_rows(np.arange(self.n))
+        return self.observation()
+
+    def _reset_rows(self, idx):
+        for arr in (self.vel_x, self.slide_vel, self.slide_timer, self.hazard_lockout, self.boost_timer,
+                    self.invincible, self.obs_timer, self.coin_timer, self.powerup_timer, self.shield_timer,
+                    self.freeze_timer, self.combo_timer, self.time):
+            arr[idx] = 0.0
+        self.weather_timer[idx] = self.rng.uniform(20.0, 40.0, len(idx))
+        self.raining[idx]       = False
+        self.x[idx]             = float(400 - Player.WIDTH // 2)
+        self.obs_interval[idx]  = self.diff.obs_interval
+        self.scroll_speed[idx]  = self.diff.base_speed
+        self.multiplier[idx]    = 1.0
+        self.score[idx]         = 0
+        self.run_coins[idx]     = 0
+        self.level[idx]         = 1
+        self.lives[idx]         = self.base_lives
+        self.combo[idx]         = 0
+        self.done[idx]          = False
+        self.dropped[idx]       = 0
+        for active, pos, speed in ((self.ob_active, self.ob_top, self.ob_speed),
+                                   (self.co_active, self.co_y, self.co_speed),
+                                   (self.pu_active, self.pu_y, self.pu_speed)):
+            active[:, idx] = False
+            pos[:, idx]    = _PARKED
+            speed[:, idx]  = 0.0
+
+    def step(self, actions, observe=True):
+        actions    = np.broadcast_to(np.asarray(actions, dtype=np.int64), (self.n,))
+        prev_score = self.score.copy()
+        live       = ~self.done
+        dtv        = np.where(live, SIM_DT, 0.0)
+
+        self.time      += dtv
+        self.invincible = np.maximum(0.0, self.invincible - dtv)
+        self._update_weather(dtv)
+
+        boost = live & (actions & ACTION_BOOST != 0) & (self.score >= 50) & (self.boost_timer <= 0)
+        self.score[boost]      -= 50
+        self.boost_timer[boost] = 1.5
+        self._update_player(dtv, actions)
+        shielded   = self.shield_timer > 0
+        vulnerable = live & (self.invincible <= 0) & ~shielded
+        edt        = np.where(self.freeze_timer > 0, dtv * 0.3, dtv).astype(np.float32)
+
+        self.obs_timer += dtv
+        spawn = np.flatnonzero(self.obs_timer >= self.obs_interval)
+        if len(spawn):
+            self.obs_timer[spawn] = 0.0
+            self._spawn_obstacles(spawn)
+
+        self.coin_timer += dtv
+        spawn = np.flatnonzero(self.coin_timer >= 1.2)
+        if len(spawn):
+            self.coin_timer[spawn] = 0.0
+            self._spawn_coin_wave(spawn)
+
+        self.powerup_timer += dtv
+        spawn = np.flatnonzero(self.powerup_timer >= 8.0)
+        if len(spawn):
+            self.powerup_timer[spawn] = 0.0
+            self._spawn_powerups(spawn)
+
+        self.ob_top += self.ob_speed * edt
+        self.co_y   += self.co_speed * edt
+        self.pu_y   += self.pu_speed * edt
+
+        px     = (np.floor(self.x) + 6).astype(np.float32)
+        is_car = self.ob_kind == KIND_CAR
+        hit    = self._pass_and_collide(is_car, 2, px, vulnerable, shielded)
+        ok     = live & ~hit
+        hit   |= self._pass_and_collide(~is_car & ok, 1, px, vulnerable, shielded)
+        ok    &= ~hit
+        self._collect_coins(ok, px)
+        self._collect_powerups(ok, px)
+
+        self.combo_timer += np.where(ok, dtv, 0.0)
+        decay = ok & (self.combo_timer >= 2.5)
+        self.combo_timer[decay] = 0.0
+        decay &= self.combo > 0
+        self.combo[decay] -= 1
+        self._recalc_multiplier(decay)
+
+        level_up = np.flatnonzero(ok & (self.score >= (20 + self.level * 6) * self.level))
+        if len(level_up):
+            self._level_up(level_up)
+
+        if hit.any():
+            self._on_hit(hit)
+
+        reward = (self.score - prev_score).astype(np.float32)
+        done   = self.done & live
+        info   = {}
+        if done.any():
+            finished = np.flatnonzero(done)
+            info = {
+                "finished": finished,
+                "score":    self.score[finished].copy(),
+                "level":    self.level[finished].copy(),
+                "coins":    self.run_coins[finished].copy(),
+                "time":     self.time[finished].copy(),
+                "dropped":  self.dropped[finished].copy(),
+            }
+            if self.auto_reset:
+                self._reset_rows(finished)
+        return (self.observation() if observe else None), reward, done, info
+
+    def _update_weather(self, dtv):
+        self.weather_timer -= dtv
+        flip = np.flatnonzero(self.weather_timer <= 0)
+        if len(flip):
+            self.raining[flip] ^= True
+            rain = self.raining[flip]
+            self.weather_timer[flip] = np.where(rain, self.rng.uniform(8.0, 15.0, len(flip)),
+                                                self.rng.uniform(20.0, 40.0, len(flip)))
+
+    def _update_player(self, dtv, actions):
+        s = Player.SPEED
+        self.boost_timer    = np.where(self.boost_timer > 0, self.boost_timer - dtv, self.boost_timer)
+        self.shield_timer   = np.where(self.shield_timer > 0, self.shield_timer - dtv, self.shield_timer)
+        self.freeze_timer   = np.where(self.freeze_timer > 0, self.freeze_timer - dtv, self.freeze_timer)
+        self.hazard_lockout = np.where(self.hazard_lockout > 0, self.hazard_lockout - dtv, self.hazard_lockout)
+        sliding             = self.slide_timer > 0
+        self.slide_timer    = np.where(sliding, self.slide_timer - dtv, self.slide_timer)
+
+        grip  = np.where(self.raining, 0.75, 1.0) * dtv
+        left  = actions & ACTION_LEFT != 0
+        right = ~left & (actions & ACTION_RIGHT != 0)
+        v     = self.vel_x
+        coast = np.clip(v - np.sign(v) * np.minimum(800 * grip, np.abs(v)), -s, s)
+        steer = np.where(left, np.maximum(v - 1200 * grip, -s), np.where(right, np.minimum(v + 1200 * grip, s), coast))
+
+        self.vel_x     = np.where(sliding, v, steer)
+        dx             = np.where(sliding, self.slide_vel, self.vel_x) * dtv
+        self.slide_vel = np.where(sliding, self.slide_vel * (1 - dtv * 3.0), self.slide_vel)
+        self.x         = np.clip(self.x + dx, _X_MIN, _X_MAX)
+
+    def _spawn_obstacles(self, idx):
+        rng   = self.rng
+        m     = len(idx)
+        spd   = rng.uniform(*self.diff.obs_speed, m)
+        occ   = _lane_mask(self.ob_active[:, idx] & (self.ob_kind[:, idx] == KIND_CAR), self.ob_lane[:, idx])
+        keys  = rng.random((m, _N_LANES))
+        keys[occ & ~occ.all(1, keepdims=True)] = -1.0
+        lane  = keys.argmax(1)
+        roll  = rng.random(m)
+        kind  = np.where(roll < 0.60, KIND_CAR, np.where(roll < 0.92, KIND_BARRIER, KIND_OIL))
+        car_h = _CAR_HEIGHTS[rng.integers(0, len(_CAR_HEIGHTS), m)]
+
+        slot, ok = self._claim(self.ob_active, idx)
+        idx, slot, lane, kind, spd, car_h = idx[ok], slot[ok], lane[ok], kind[ok], spd[ok], car_h[ok]
+        is_car = kind == KIND_CAR
+        y      = np.where(is_car, -car_h - 10, np.where(kind == KIND_BARRIER, -Barrier.HEIGHT, -OilSlick.HEIGHT))
+        left   = _LANES[lane] + _RECT_LEFT[kind]
+        self.ob_active[slot, idx] = True
+        self.ob_kind[slot, idx]   = kind
+        self.ob_lane[slot, idx]   = lane
+        self.ob_speed[slot, idx]  = np.where(kind == KIND_OIL, spd * 0.8, spd)
+        self.ob_top[slot, idx]    = y + _RECT_TOP[kind]
+        self.ob_exit[slot, idx]   = HEIGHT + _RECT_TOP[kind]
+        self.ob_left[slot, idx]   = left
+        self.ob_right[slot, idx]  = left + _RECT_W[kind]
+        self.ob_h[slot, idx]      = np.where(is_car, car_h - 8,
+                                             np.where(kind == KIND_BARRIER, Barrier.HEIGHT, OilSlick.HEIGHT))
+
+    def _claim(self, active, idx):
+        slot, ok = _first_free(active[:, idx])
+        self.dropped[idx[~ok]] += 1
+        return slot, ok
+
+    def _add_coins(self, idx, lane, speed):
+        slot, ok = self._claim(self.co_active, idx)
+        idx, slot = idx[ok], slot[ok]
+        self.co_active[slot, idx] = True
+        self.co_lane[slot, idx]   = lane[ok]
+        self.co_y[slot, idx]      = -Coin.RADIUS * 2
+        self.co_speed[slot, idx]  = speed[ok]
+
+    def _spawn_coin_wave(self, idx):
+        rng   = self.rng
+        m     = len(idx)
+        avail = ~_lane_mask(self.co_active[:, idx] & (self.co_y[:, idx] < 0), self.co_lane[:, idx])
+        avail[~avail.any(1)] = True
+        keys  = rng.random((m, _N_LANES))
+        keys[~avail] = 2.0
+        order = keys.argsort(1)
+        count = np.where(rng.random(m) < 0.3, rng.integers(2, 5, m), 1)
+        count = np.minimum(count, avail.sum(1))
+        speed = self.scroll_speed[idx] * 0.95
+        for j in range(_N_LANES):
+            sel = count > j
+            self._add_coins(idx[sel], order[sel, j], speed[sel])
+
+    def _spawn_powerups(self, idx):
+        idx  = idx[self.rng.random(len(idx)) < 0.55]
+        m    = len(idx)
+        kind = self.rng.integers(0, 2, m)
+        lane = self.rng.integers(0, _N_LANES, m)
+        slot, ok = self._claim(self.pu_active, idx)
+        idx, slot = idx[ok], slot[ok]
+        self.pu_active[slot, idx] = True
+        self.pu_kind[slot, idx]   = kind[ok]
+        self.pu_lane[slot, idx]   = lane[ok]
+        self.pu_y[slot, idx]      = -PowerUp.RADIUS * 2
+        self.pu_speed[slot, idx]  = self.scroll_speed[idx] * 0.85
+
+    @staticmethod
+    def _park(mask, active, pos, speed):
+        active[mask] = False
+        pos[mask]    = _PARKED
+        speed[mask]  = 0.0
+
+    def _pass_and_collide(self, sel, points, px, vulnerable, shielded):
+        top    = self.ob_top
+        passed = sel & (top > self.ob_exit)
+        if passed.any():
+            self._park(passed, self.ob_active, self.ob_top, self.ob_speed)
+            self._score_passes(passed.sum(0), points)
+
+        touches = (sel & (top < _P_BOTTOM) & (top + self.ob_h > _P_TOP)
+                   & (self.ob_left < px + _P_W) & (self.ob_right > px))
+        if not touches.any():
+            return np.zeros(self.n, bool)
+
+        oil = touches & (self.ob_kind == KIND_OIL)
+        if oil.any():
+            self._park(oil, self.ob_active, self.ob_top, self.ob_speed)
+            slip = oil.any(0) & ~shielded & (self.hazard_lockout <= 0)
+            self.slide_vel[slip]      = self.rng.choice([-1.0, 1.0], slip.sum()) * Player.SPEED * 1.2
+            self.slide_timer[slip]    = 1.0
+            self.hazard_lockout[slip] = 1.0
+            touches &= ~oil
+        return touches.any(0) & vulnerable
+
+    def _score_passes(self, counts, points):
+        for k in range(counts.max()):
+            rows = np.flatnonzero(counts > k)
+            self.combo[rows] += 1
+            self._recalc_multiplier(rows)
+            self.score[rows] += (points * self.multiplier[rows]).astype(np.int64)
+
+    def _touching(self, y, lane, radius, px):
+        cx = _LANES[lane]
+        return (y - radius < _P_BOTTOM) & (y + radius > _P_TOP) & (cx - radius < px + _P_W) & (cx + radius > px)
+
+    def _collect_coins(self, ok, px):
+        self._park(self.co_y > HEIGHT, self.co_active, self.co_y, self.co_speed)
+        band = (self.co_y + Coin.RADIUS > _P_TOP) & ok
+        if not band.any():
+            return
+        got = band & self._touching(self.co_y, self.co_lane, Coin.RADIUS, px)
+        self._park(got, self.co_active, self.co_y, self.co_speed)
+        counts = got.sum(0)
+        for k in range(counts.max()):
+            rows = np.flatnonzero(counts > k)
+            self.combo[rows] += 1
+            self._recalc_multiplier(rows)
+            gain = (COIN_BASE_VALUE * self.multiplier[rows]).astype(np.int64)
+            self.score[rows]     += gain
+            self.run_coins[rows] += gain
+            lucky = rows[(self.rng.random(len(rows)) < 0.1) & (self.boost_timer[rows] <= 0)]
+            self.boost_timer[lucky] = 1.5
+
+    def _collect_powerups(self, ok, px):
+        self._park(self.pu_y > HEIGHT, self.pu_active, self.pu_y, self.pu_speed)
+        got = ok & self._touching(self.pu_y, self.pu_lane, PowerUp.RADIUS, px)
+        if not got.any():
+            return
+        for kind, timer in ((PU_SHIELD, self.shield_timer), (PU_TIMEFREEZE, self.freeze_timer)):
+            rows = (got & (self.pu_kind == kind)).any(0)
+            timer[rows] = _PU_DURATION[kind]
+        self._park(got, self.pu_active, self.pu_y, self.pu_speed)
+
+    def _level_up(self, idx):
+        diff = self.diff
+        self.level[idx]       += 1
+        self.scroll_speed[idx] = np.minimum(self.scroll_speed[idx] + diff.speed_inc, diff.base_speed * 2.5)
+        self.obs_interval[idx] = np.maximum(0.6, self.obs_interval[idx] - 0.05)
+        lanes = self.rng.integers(0, _N_LANES, (len(idx), 5))
+        speed = self.scroll_speed[idx] * 0.9
+        for j in range(5):
+            self._add_coins(idx, lanes[:, j], speed)
+
+    def _on_hit(self, hit):
+        self.lives[hit] -= 1
+        self.combo[hit]  = 0
+        self._recalc_multiplier(hit)
+        self.done |= hit & (self.lives <= 0)
+        self.invincible[hit & ~self.done] = 2.0
+
+    def _recalc_multiplier(self, rows):
+        self.multiplier[rows] = _MULT_TABLE[np.searchsorted(_THRESHOLDS, self.combo[rows], side="left")]
+
+    def observation(self):
+        obs = np.empty((self.n, OBS_DIM), np.float32)
+        obs[:, 0]  = (self.x - _X_MIN) / (_X_MAX - _X_MIN)
+        obs[:, 1]  = self.vel_x / Player.SPEED
+        obs[:, 2]  = np.maximum(self.slide_timer, 0.0)
+        obs[:, 3]  = self.invincible / 2.0
+        obs[:, 4]  = np.maximum(self.boost_timer, 0.0) / 1.5
+        obs[:, 5]  = self.lives / self.base_lives
+        obs[:, 6]  = self.multiplier / _MULT_TABLE.max()
+        obs[:, 7]  = self.score >= 50
+        obs[:, 8]  = np.maximum(self.shield_timer, 0.0) / _PU_DURATION[PU_SHIELD]
+        obs[:, 9]  = np.maximum(self.freeze_timer, 0.0) / _PU_DURATION[PU_TIMEFREEZE]
+        obs[:, 10] = self.raining
+
+        obs[:, 11:] = 1.0
+        _lane_minima(obs, 11, self.ob_lane + _N_LANES * (self.ob_kind == KIND_OIL), self.ob_top, 0, self.ob_h)
+        _lane_minima(obs, 11 + 2 * _N_LANES, self.co_lane, self.co_y, Coin.RADIUS, Coin.RADIUS)
+        _lane_minima(obs, 11 + 3 * _N_LANES, self.pu_lane, self.pu_y, PowerUp.RADIUS, PowerUp.RADIUS)
+        np.clip(obs[:, 11:], 0.0, 1.0, out=obs[:, 11:])
+        return obs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Step a batch of races with random actions and report throughput")
+    parser.add_argument("--envs", type=int, default=4096)
+    parser.add_argument("--steps", type=int, default=2000)
+    parser.add_argument("--difficulty", choices=list(DIFFICULTY), default="Medium")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-observe", action="store_true", help="skip building observations, as reward-only callers do")
+    args = parser.parse_args(argv)
+
+    env     = BatchRaceEnv(args.envs, args.difficulty, seed=args.seed)
+    rng     = np.random.default_rng(args.seed)
+    scores  = []
+    dropped = 0
+    start   = time.perf_counter()
+    for _ in range(args.steps):
+        _, _, _, info = env.step(rng.integers(0, 8, args.envs), observe=not args.no_observe)
+        if info:
+            scores.extend(info["score"])
+            dropped += info["dropped"].sum()
+    wall = time.perf_counter() - start
+    print(f"{args.envs * args.steps / wall:,.0f} ticks/s ({args.envs} envs x {args.steps} steps in {wall:.2f}s)")
+    if scores:
+        print(f"{len(scores)} races finished, mean score {np.mean(scores):.1f}")
+    dropped += env.dropped.sum()
+    if dropped:
+        print(f"{dropped} spawns dropped because every slot was full; raise max_obstacles, max_coins or max_powerups")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import os
+import sys
+import json
+import time
+import argparse
+from collections import namedtuple
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+
+from atari import (
+    LANE_CENTERS, HEIGHT, SIM_DT, WEATHER_CLEAR, WEATHER_RAIN, POWERUP_SHIELD, POWERUP_TIMEFREEZE,
+    Game, ObstacleCar, Barrier, OilSlick, Coin, PowerUp, _dummy_sounds,
+)
+
+Scenario    = namedtuple("Scenario", "name setup step")
+FrameStats  = namedtuple("FrameStats", "mean p95 p99 fps")
+
+DEFAULT_BASELINE = "bench_baseline.json"
+
+_LONG = 1e9
+
+
+def _playing(game):
+    game._reset_state(0)
+    game.state               = "playing"
+    game.lives               = 10 ** 6
+    game.weather             = WEATHER_CLEAR
+    game.weather_timer       = _LONG
+    game.invincibility_timer = 0.0
+    game._rain_pool.set_active(0)
+
+
+def _scroll(game, dt):
+    game.road.scroll_speed = game.scroll_speed
+    game.road.update(dt)
+
+
+def _setup_empty(game):
+    _playing(game)
+
+
+def _setup_traffic(game):
+    _playing(game)
+    store = game.entities
+    speed = game.scroll_speed
+    for row in range(8):
+        y = row * (HEIGHT + 100) / 8 - 100
+        for lane, lc in enumerate(LANE_CENTERS):
+            pick = (row + lane) % 5
+            if pick < 2:
+                i = ObstacleCar.spawn(store, lane, speed, game.rng)
+            elif pick == 2:
+                i = Barrier.spawn(store, lc - Barrier.WIDTH // 2, speed)
+            elif pick == 3:
+                i = OilSlick.spawn(store, lc - OilSlick.WIDTH // 2, speed * 0.8)
+            else:
+                i = Coin.spawn(store, lc, speed * 0.95, game.rng)
+            store.y[i] = y
+        i = PowerUp.spawn(store, LANE_CENTERS[row % 4], speed * 0.85, (POWERUP_SHIELD, POWERUP_TIMEFREEZE)[row % 2])
+        store.y[i] = y + 50
+    game.speed_blur_alpha = 120
+
+
+def _step_traffic(game, dt):
+    _scroll(game, dt)
+    store          = game.entities
+    store.y       += store.speed * dt
+    store.phase   += store.phase_rate * dt
+    store.y[store.y > HEIGHT] -= HEIGHT + 100
+
+
+def _setup_rain(game):
+    _playing(game)
+    game.weather        = WEATHER_RAIN
+    game.rain_intensity = 1.0
+    game._rain_pool.set_active(game._rain_drops())
+
+
+def _setup_particles(game):
+    _playing(game)
+
+
+def _step_particles(game, dt):
+    _scroll(game, dt)
+    game._on_hit()
+
+
+def _setup_menu(game):
+    game._reset_state(0)
+    game.state = "menu"
+
+
+def _setup_gameover(game):
+    _playing(game)
+    game.score = 1234
+    game.state = "gameover"
+
+
+def _still(game, dt):
+    pass
+
+
+SCENARIOS = (
+    Scenario("empty_road", _setup_empty, _scroll),
+    Scenario("max_traffic", _setup_traffic, _step_traffic),
+    Scenario("rain_storm", _setup_rain, _scroll),
+    Scenario("particle_storm", _setup_particles, _step_particles),
+    Scenario("menu", _setup_menu, _still),
+    Scenario("gameover", _setup_gameover, _still),
+)
+
+
+def frame_stats(times_ms):
+    times = np.asarray(times_ms)
+    mean  = float(times.mean())
+    return FrameStats(mean, float(np.percentile(times, 95)), float(np.percentile(times, 99)), 1000.0 / mean)
+
+
+def median_stats(runs):
+    return FrameStats(*(float(np.median(values)) for values in zip(*runs)))
+
+
+def run_scenario(game, scenario, frames, warmup):
+    scenario.setup(game)
+    times = []
+    for n in range(warmup + frames):
+        start = time.perf_counter()
+        scenario.step(game, SIM_DT)
+        game._draw(SIM_DT)
+        if n >= warmup:
+            times.append((time.perf_counter() - start) * 1000.0)
+    return frame_stats(times)
+
+
+def compare(results, baseline, threshold, p95_threshold):
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for field, limit in (("mean", threshold), ("p95", p95_threshold)):
+            if getattr(stats, field) > base[field] * (1.0 + limit):
+                regressions.append((name, field, base[field], getattr(stats, field)))
+    return regressions
+
+
+def print_table(results, baseline, out=sys.stdout):
+    out.write(f"{'scenario':<16} {'mean':>7} {'p95':>7} {'p99':>7} {'fps':>7} {'vs base':>8}\n")
+    for name, s in results.items():
+        base  = baseline.get(name)
+        delta = f"{s.mean / base['mean'] - 1.0:+8.1%}" if base else f"{'-':>8}"
+        out.write(f"{name:<16} {s.mean:7.2f} {s.p95:7.2f} {s.p99:7.2f} {s.fps:7.0f} {delta}\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Game._draw on scripted scenarios with the dummy video driver")
+    parser.add_argument("--scenario", action="append", choices=[s.name for s in SCENARIOS],
+                        help="run only this scenario; repeat for several")
+    parser.add_argument("--frames", type=int, default=300, help="measured frames per scenario")
+    parser.add_argument("--warmup", type=int, default=30, help="unmeasured frames before each scenario")
+    parser.add_argument("--repeats", type=int, default=5,
+                        help="runs per scenario; each statistic is the median across runs")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, metavar="PATH")
+    parser.add_argument("--save-baseline", action="store_true", help="write this run's results to the baseline file")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="fractional slowdown in median mean frame time counted as a regression")
+    parser.add_argument("--p95-threshold", type=float, default=0.30,
+                        help="fractional slowdown in median p95 frame time counted as a regression")
+    args = parser.parse_args(argv)
+
+    game    = Game(seed=0, persist=False)
+    game.sounds = _dummy_sounds()
+    chosen  = [s for s in SCENARIOS if not args.scenario or s.name in args.scenario]
+    runs    = {s.name: [] for s in chosen}
+    for _ in range(max(1, args.repeats)):
+        for s in chosen:
+            runs[s.name].append(run_scenario(game, s, args.frames, args.warmup))
+    results = {name: median_stats(stats) for name, stats in runs.items()}
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_table(results, baseline)
+
+    if args.save_baseline:
+        baseline.update({name: s._asdict() for name, s in results.items()})
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold, args.p95_threshold)
+    for name, field, base, now in regressions:
+        print(f"REGRESSION {name} {field}: {base:.2f} -> {now:.2f} ms")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,4 @@
+import time
+
+# atari.py imports this before pygame and numpy, so the startup report includes them.
+IMPORT_START = time.perf_counter()
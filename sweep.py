@@ -0,0 +1,224 @@
+import os
+import csv
+import sys
+import time
+import random
+import argparse
+import itertools
+from collections import namedtuple
+from multiprocessing import Pool
+
+import atari
+from atari import DIFFICULTY, DiffSettings, SimInput, SIM_MAX_TIME, Game, Replay, autopilot
+
+SweepConfig = namedtuple("SweepConfig", "base_speed obs_interval speed_inc obs_speed speed_step speed_level life_level")
+SweepTask   = namedtuple("SweepTask", "config_id config player seeds max_time")
+RunRecord   = namedtuple("RunRecord", "config_id seed score level coins time lives")
+
+_SWEEP_DIFF = "_sweep"
+_FIELDS     = SweepConfig._fields
+
+_game   = None
+_script = None
+
+
+def _idle_player(seed):
+    idle = SimInput(False, False, False)
+    return lambda game: idle
+
+
+def _weave_player(seed):
+    rng   = random.Random(seed ^ 0x5EED)
+    state = {"inp": SimInput(False, False, False), "left": 0}
+
+    def control(game):
+        if state["left"] <= 0:
+            state["inp"]  = SimInput(*rng.choice(((True, False), (False, True), (False, False))), rng.random() < 0.02)
+            state["left"] = rng.randint(6, 40)
+        state["left"] -= 1
+        return state["inp"]
+    return control
+
+
+def _autopilot_player(seed):
+    return autopilot
+
+
+def _script_player(seed):
+    play  = _script.controller()
+    ticks = itertools.cycle([play(None) for _ in range(len(_script))])
+    return lambda game: next(ticks)
+
+
+PLAYERS = {
+    "autopilot": _autopilot_player,
+    "weave":     _weave_player,
+    "idle":      _idle_player,
+}
+
+
+def _init_worker(script_path):
+    global _game, _script
+    _game = Game(headless=True)
+    if script_path:
+        _script = Replay.load(script_path)
+
+
+def _apply(config):
+    atari.UPGRADE_SPEED_STEP   = config.speed_step
+    DIFFICULTY[_SWEEP_DIFF]    = DiffSettings(config.base_speed, config.obs_interval, config.speed_inc, config.obs_speed)
+    _game.selected_diff        = _SWEEP_DIFF
+    _game._upgrades            = {"speed": config.speed_level, "life": config.life_level}
+
+
+def _run_task(task):
+    _apply(task.config)
+    make    = _script_player if task.player == "script" else PLAYERS[task.player]
+    records = []
+    for seed in task.seeds:
+        r = _game.simulate(make(seed), max_time=task.max_time, seed=seed)
+        records.append(RunRecord(task.config_id, seed, r.score, r.level, r.coins, r.time, r.lives))
+    return records
+
+
+def _parse_list(text, cast):
+    return [cast(v) for v in text.split(",")]
+
+
+def _parse_ranges(text):
+    ranges = []
+    for part in text.split(","):
+        lo, _, hi = part.partition(":")
+        ranges.append((float(lo), float(hi or lo)))
+    return ranges
+
+
+def build_grid(base, **axes):
+    defaults = {
+        "base_speed":   [base.base_speed],
+        "obs_interval": [base.obs_interval],
+        "speed_inc":    [base.speed_inc],
+        "obs_speed":    [base.obs_speed],
+        "speed_step":   [atari.UPGRADE_SPEED_STEP],
+        "speed_level":  [0],
+        "life_level":   [0],
+    }
+    defaults.update({k: v for k, v in axes.items() if v})
+    return [SweepConfig(*values) for values in itertools.product(*(defaults[f] for f in _FIELDS))]
+
+
+def make_tasks(grid, runs, chunk, seed, player, max_time):
+    tasks = []
+    for config_id, config in enumerate(grid):
+        first = seed + config_id * runs
+        for start in range(0, runs, chunk):
+            seeds = range(first + start, first + min(start + chunk, runs))
+            tasks.append(SweepTask(config_id, config, player, seeds, max_time))
+    return tasks
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def summarize(grid, records):
+    by_config = {}
+    for rec in records:
+        by_config.setdefault(rec.config_id, []).append(rec)
+    rows = []
+    for config_id, config in enumerate(grid):
+        recs = by_config.get(config_id)
+        if not recs:
+            continue
+        n      = len(recs)
+        coins  = sum(r.coins for r in recs) / n
+        cost   = (sum(atari.upgrade_speed_cost(lv) for lv in range(config.speed_level))
+                  + sum(atari.upgrade_life_cost(lv) for lv in range(config.life_level)))
+        rows.append({
+            "config":      config_id,
+            **config._asdict(),
+            "runs":        n,
+            "survival":    sum(r.time for r in recs) / n,
+            "survival_p10": _percentile([r.time for r in recs], 0.1),
+            "score":       sum(r.score for r in recs) / n,
+            "score_p90":   _percentile([r.score for r in recs], 0.9),
+            "level":       sum(r.level for r in recs) / n,
+            "coins":       coins,
+            "timeouts":    sum(r.lives > 0 for r in recs) / n,
+            "runs_to_buy": cost / coins if coins else float("inf"),
+        })
+    return rows
+
+
+def print_table(rows, out=sys.stdout):
+    header = ("cfg", "base", "intv", "inc", "obs_speed", "step", "spd", "life",
+              "runs", "surv", "p10", "score", "p90", "lvl", "coins", "tmo", "buy")
+    out.write(("{:>4} {:>6} {:>5} {:>4} {:>11} {:>5} {:>3} {:>4} {:>5} {:>6} {:>6} {:>7} {:>6} {:>5} {:>6} {:>4} {:>6}\n")
+              .format(*header))
+    for r in rows:
+        obs_speed = "{:g}-{:g}".format(*r["obs_speed"])
+        out.write(f"{r['config']:>4} {r['base_speed']:>6g} {r['obs_interval']:>5g} {r['speed_inc']:>4g} {obs_speed:>11} "
+                  f"{r['speed_step']:>5g} {r['speed_level']:>3} {r['life_level']:>4} {r['runs']:>5} "
+                  f"{r['survival']:>6.1f} {r['survival_p10']:>6.1f} {r['score']:>7.1f} {r['score_p90']:>6} "
+                  f"{r['level']:>5.2f} {r['coins']:>6.1f} {r['timeouts']:>4.0%} {r['runs_to_buy']:>6.1f}\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep difficulty and upgrade settings over simulated races")
+    parser.add_argument("--difficulty", choices=[d for d in DIFFICULTY if d != _SWEEP_DIFF], default="Medium",
+                        help="preset supplying any setting not swept")
+    parser.add_argument("--base-speed", type=lambda s: _parse_list(s, float), metavar="V[,V...]")
+    parser.add_argument("--obs-interval", type=lambda s: _parse_list(s, float), metavar="V[,V...]")
+    parser.add_argument("--speed-inc", type=lambda s: _parse_list(s, float), metavar="V[,V...]")
+    parser.add_argument("--obs-speed", type=_parse_ranges, metavar="LO:HI[,LO:HI...]")
+    parser.add_argument("--speed-step", type=lambda s: _parse_list(s, float), metavar="V[,V...]",
+                        help="UPGRADE_SPEED_STEP values")
+    parser.add_argument("--speed-level", type=lambda s: _parse_list(s, int), metavar="N[,N...]",
+                        help="speed upgrade levels to equip")
+    parser.add_argument("--life-level", type=lambda s: _parse_list(s, int), metavar="N[,N...]",
+                        help="life upgrade levels to equip, may exceed UPGRADE_LIFE_MAX_LEVEL")
+    parser.add_argument("--player", choices=list(PLAYERS), default="autopilot")
+    parser.add_argument("--script", metavar="PATH", help="drive every race with a recorded replay's input, looped")
+    parser.add_argument("--runs", type=int, default=50, help="races per configuration")
+    parser.add_argument("--chunk", type=int, default=10, help="races per worker task")
+    parser.add_argument("--seed", type=int, default=0, help="first seed; each configuration gets its own range")
+    parser.add_argument("--max-time", type=float, default=SIM_MAX_TIME)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--csv", metavar="PATH", help="stream every race to a CSV file as it finishes")
+    args = parser.parse_args(argv)
+
+    grid  = build_grid(DIFFICULTY[args.difficulty], base_speed=args.base_speed, obs_interval=args.obs_interval,
+                       speed_inc=args.speed_inc, obs_speed=args.obs_speed, speed_step=args.speed_step,
+                       speed_level=args.speed_level, life_level=args.life_level)
+    tasks = make_tasks(grid, args.runs, max(1, args.chunk), args.seed,
+                       "script" if args.script else args.player, args.max_time)
+    total = len(grid) * args.runs
+    print(f"{len(grid)} configurations x {args.runs} races on {args.workers} workers")
+
+    records = []
+    start   = time.perf_counter()
+    out     = open(args.csv, "w", newline="") if args.csv else None
+    try:
+        writer = None
+        if out:
+            writer = csv.writer(out)
+            writer.writerow(_FIELDS + RunRecord._fields)
+        with Pool(args.workers, initializer=_init_worker, initargs=(args.script,)) as pool:
+            for batch in pool.imap_unordered(_run_task, tasks):
+                records.extend(batch)
+                if writer:
+                    for rec in batch:
+                        writer.writerow(grid[rec.config_id] + rec)
+                    out.flush()
+                elapsed = time.perf_counter() - start
+                print(f"\r{len(records)}/{total} races, {len(records) / elapsed:.1f}/s", end="", flush=True)
+    finally:
+        if out:
+            out.close()
+    print()
+    print_table(summarize(grid, records))
+
+
+if __name__ == "__main__":
+    main()
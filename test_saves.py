@@ -0,0 +1,66 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pytest
+
+from atari import _LEGACY_HIGH_SCORE, _LEGACY_PROGRESS, HistoryRow, RunHistory, SaveWriter, read_save, write_save
+
+
+@pytest.mark.parametrize("ending", [b"", b"\n", b"\r\n", b"  \n\n"])
+def test_legacy_saves_load_with_trailing_whitespace(tmp_path, ending):
+    score    = tmp_path / "highscore.txt"
+    progress = tmp_path / "progress.txt"
+    score.write_bytes(b"1234" + ending)
+    progress.write_bytes(b"950,2,1" + ending)
+    assert read_save(str(score), _LEGACY_HIGH_SCORE) == "1234"
+    assert read_save(str(progress), _LEGACY_PROGRESS) == "950,2,1"
+
+
+def test_legacy_format_is_only_accepted_when_asked(tmp_path):
+    path = tmp_path / "highscore.txt"
+    path.write_bytes(b"1234\n")
+    assert read_save(str(path)) is None
+    path.write_bytes(b"12x4\n")
+    assert read_save(str(path), _LEGACY_HIGH_SCORE) is None
+
+
+def test_checksummed_save_round_trips_and_falls_back_to_backup(tmp_path):
+    path = str(tmp_path / "progress.txt")
+    write_save(path, "100,1,0")
+    write_save(path, "200,1,0")
+    assert read_save(path, _LEGACY_PROGRESS) == "200,1,0"
+    with open(path, "w") as f:
+        f.write("200,1,0\ndeadbeef\n")
+    assert read_save(path, _LEGACY_PROGRESS) == "100,1,0"
+
+
+def test_save_writer_raises_handler_bugs_from_flush(tmp_path):
+    def write(path, text):
+        if text == "bad":
+            raise ValueError(text)
+        write_save(path, text)
+
+    writer = SaveWriter(write)
+    path   = str(tmp_path / "progress.txt")
+    writer.save(path, "bad")
+    with pytest.raises(ValueError):
+        writer.flush()
+    assert writer.errors == 1
+    writer.save(path, "100,1,0")
+    assert writer.flush()
+    assert read_save(path) == "100,1,0"
+
+
+def test_run_history_counts_match_inserted_rows(tmp_path):
+    history = RunHistory(str(tmp_path / "runs.db"))
+    rows    = [HistoryRow(0.0, diff, skin, 100, 1, 0, 10.0, 0, 0, 0)
+               for diff in ("Easy", "Hard") for skin in (0, 3) for _ in range(skin + 1)]
+    history._insert_batch(rows[:3])
+    history._insert_batch(rows[3:])
+    assert history.count() == len(rows)
+    assert history.count("Hard") == 5
+    assert history.count(skin=3) == 8
+    assert history.count("Easy", 0) == 1
+    assert history.count("Medium") == 0